@@ -0,0 +1,891 @@
+#!/usr/bin/env python
+"""
+
+viewerSync Soak Test
+====================
+
+Drives viewerSync headless for a long run of knob changes and checks that it
+neither slows down nor holds on to memory as the session goes on.
+
+Nuke isn't needed: a stand-in `nuke` module, just complete enough for
+viewerSync's callbacks, is installed before viewerSync is imported. Knob
+changes on the stand-in run the node's knobChanged script and the
+registered knobChanged callbacks synchronously, like Nuke does for user
+edits.
+
+Two groups are soaked: one synced through the knobChanged dispatcher, and
+one linked with `sync_viewers()` callback strings, as in scripts saved by
+older versions of viewerSync. Every iteration changes gain, ROI, channels
+and the viewed input of a viewer in the first group, and gain and ROI in the
+second. Every `--cycle` iterations the first group is torn down with
+`remove_callbacks()` and set up again, a scratch viewer is created and
+deleted, and a batch of edits is made with sync paused.
+
+Before the soak itself, a few regression checks run against the same
+stand-in script.
+
+The run fails, exiting with status 1, if:
+
+- a regression check fails, or
+- the mean time of a knob change callback is over `--callback-limit`
+  seconds, or
+- the mean memory a knob change callback allocates, measured with
+  tracemalloc peaks, is over `--allocation-limit` bytes, or
+- memory retained between the end of the warm up and the end of the run,
+  measured with tracemalloc snapshots, grows by more than `--growth-limit`
+  bytes.
+
+## Usage
+
+From the root of the repository:
+::
+    python tests/soak.py
+    python tests/soak.py --iterations 200000 --cycle 500
+
+The allocation figure needs `tracemalloc.reset_peak()`, from Python 3.9.
+
+## License
+
+The MIT License (MIT)
+
+viewerSync
+Copyright (c) 2011-2014 Philippe Huberdeau and Sean Wallitsch
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+# =============================================================================
+# IMPORTS
+# =============================================================================
+
+# Standard Imports
+from __future__ import print_function
+import argparse
+import gc
+import os
+import sys
+import time
+import types
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+# =============================================================================
+# GLOBALS
+# =============================================================================
+
+# Defaults for the command line options.
+ITERATIONS = 50000
+WARM_UP = 2000
+CYCLE = 1000
+
+# Mean seconds a single knob change may take, including the fan out to every
+# linked viewer.
+CALLBACK_LIMIT = 0.0001
+
+# Mean bytes a single knob change may allocate, counting memory that is
+# freed again before the callback returns.
+ALLOCATION_LIMIT = 4 * 1024
+
+# Bytes viewerSync may retain between the end of the warm up and the end of
+# the run. Caches fill during the warm up, so anything that keeps growing
+# after it is a leak. The run should comfortably stay under this.
+GROWTH_LIMIT = 64 * 1024
+
+# Synced viewers in the soaked group.
+VIEWER_COUNT = 4
+
+# Unrelated nodes in the stand-in script, so that anything scanning the node
+# graph on every callback shows up against the callback limit.
+PADDING_NODES = 10000
+
+# Toggles switched on for the soaked group, on top of SYNC_DEFAULTS.
+TOGGLES = ['gain', 'channels', 'inputs', 'roi']
+
+# =============================================================================
+# STAND-IN NUKE
+# =============================================================================
+
+
+class _Knob(object):
+    """A knob holding a single value, firing knobChanged when set."""
+
+    def __init__(self, name, label=None, value=None):
+        self._name = name
+        self._value = value
+        self.node = None
+        self.flags = 0
+
+    def clearFlag(self, flag):
+        self.flags &= ~flag
+
+    def getValue(self):
+        return self._value
+
+    def name(self):
+        return self._name
+
+    def setFlag(self, flag):
+        self.flags |= flag
+
+    def setTooltip(self, tooltip):
+        pass
+
+    def setValue(self, value):
+        self._value = value
+        if self.node is not None:
+            self.node._fire(self)
+
+    def value(self):
+        return self._value
+
+# =============================================================================
+
+
+class _Format(object):
+    """An image format, only width and height."""
+
+    def __init__(self, width, height):
+        self._width = width
+        self._height = height
+
+    def height(self):
+        return self._height
+
+    def width(self):
+        return self._width
+
+# =============================================================================
+
+
+class _Node(object):
+    """A top level node with the knobs viewerSync reads on a Viewer."""
+
+    DEFAULTS = {
+        'channels': 'rgba',
+        'downrez': '1',
+        'gain': 1.0,
+        'gamma': 1.0,
+        'input_number': 0,
+        'inputChange': None,
+        'knobChanged': '',
+        'roi': {'x': 0, 'y': 0, 'r': 100, 't': 100},
+        'viewerProcess': 'sRGB',
+        'zoom_lock': False,
+    }
+
+    def __init__(self, name, node_class='Viewer'):
+        self._class = node_class
+        self._inputs = {}
+        self._knobs = {}
+        self.layers = ['rgba', 'rgb', 'alpha']
+        self.node_format = _Format(1920, 1080)
+        self.selected = False
+
+        knobs = dict(self.DEFAULTS)
+        knobs['name'] = name
+        for knob_name, value in knobs.items():
+            self.addKnob(_Knob(knob_name, value=value))
+
+        _STATE['nodes'][name] = self
+        _run_callbacks('create', self)
+
+    def __getitem__(self, knob):
+        try:
+            return self._knobs[knob]
+        except KeyError:
+            raise NameError(knob)
+
+    def Class(self):
+        return self._class
+
+    def addKnob(self, knob):
+        knob.node = self
+        self._knobs[knob.name()] = knob
+
+    def format(self):
+        return self.node_format
+
+    def fullName(self):
+        return self._knobs['name'].value()
+
+    def input(self, i):
+        return self._inputs.get(i)
+
+    def inputs(self):
+        return max(self._inputs) + 1 if self._inputs else 0
+
+    def isSelected(self):
+        return self.selected
+
+    def knob(self, name):
+        return self._knobs.get(name)
+
+    def knobs(self):
+        return dict(self._knobs)
+
+    def name(self):
+        return self.fullName()
+
+    def removeKnob(self, knob):
+        del self._knobs[knob.name()]
+
+    def setInput(self, i, node):
+        self._inputs[i] = node
+        self._fire(self._knobs['inputChange'])
+
+    def setSelected(self, selected):
+        self.selected = selected
+
+    def _fire(self, knob):
+        """Runs this node's knobChanged script and registered callbacks."""
+        if _STATE['knob'] is not None:
+            # Like Nuke, changes made from inside a callback don't fire.
+            return
+        _STATE['node'], _STATE['knob'] = self, knob
+        try:
+            script = self._knobs['knobChanged'].value()
+            if script:
+                # Scripts run in Nuke's main namespace, where the menu.py
+                # imports, like viewerSync, live.
+                code = _STATE['compiled'].get(script)
+                if code is None:
+                    code = compile(script, '<knobChanged>', 'exec')
+                    _STATE['compiled'][script] = code
+                exec(code, {'viewerSync': sys.modules['viewerSync']})
+            for callback, node_class in _STATE['knob_changed']:
+                if node_class in ['*', self._class]:
+                    callback()
+        finally:
+            _STATE['node'], _STATE['knob'] = None, None
+
+# =============================================================================
+
+
+class _Root(object):
+    """The root of the node graph, with proxy mode off."""
+
+    KNOBS = {'proxy': _Knob('proxy', value=False)}
+
+    def __getitem__(self, knob):
+        try:
+            return self.KNOBS[knob]
+        except KeyError:
+            raise NameError(knob)
+
+    def Class(self):
+        return 'Root'
+
+    def fullName(self):
+        return 'root'
+
+# =============================================================================
+
+
+class _Undo(object):
+    """An undo group that records nothing."""
+
+    def begin(self, name=None):
+        pass
+
+    def end(self):
+        pass
+
+# =============================================================================
+
+
+# Everything the stand-in module keeps between calls.
+_STATE = {
+    'compiled': {},
+    'nodes': {},
+    'node': None,
+    'knob': None,
+    'knob_changed': [],
+    'create': [],
+    'destroy': [],
+    'close': [],
+}
+
+
+def _run_callbacks(kind, node):
+    """Runs the onCreate or onDestroy callbacks with node as thisNode."""
+    _STATE['node'] = node
+    try:
+        for callback, node_class in _STATE[kind]:
+            if node_class in ['*', node.Class()]:
+                callback()
+    finally:
+        _STATE['node'] = None
+
+
+def _stand_in_nuke():
+    """Returns a module standing in for `nuke`, for viewerSync to import.
+
+    Args:
+        N/A
+
+    Returns:
+        (<module>)
+
+    Raises:
+        N/A
+
+    """
+    nuke = types.ModuleType('nuke')
+
+    nuke.GUI = True
+    nuke.INVISIBLE = 0x400
+    nuke.STARTLINE = 0x1000
+
+    nuke.Boolean_Knob = lambda name, label=None: _Knob(name, label, False)
+    nuke.Int_Knob = lambda name, label=None: _Knob(name, label, 0)
+    nuke.String_Knob = lambda name, label=None: _Knob(name, label, '')
+    nuke.Tab_Knob = _Knob
+    nuke.Text_Knob = _Knob
+    nuke.Undo = _Undo
+
+    def add_callback(kind):
+        """Returns an add function for the given callback list."""
+        def add(callback, args=(), kwargs=None, nodeClass='*'):
+            _STATE[kind].append((callback, nodeClass))
+        return add
+
+    def remove_knob_changed(callback, args=(), kwargs=None, nodeClass='*'):
+        _STATE['knob_changed'][:] = [
+            entry for entry in _STATE['knob_changed']
+            if entry != (callback, nodeClass)
+        ]
+
+    nuke.addKnobChanged = add_callback('knob_changed')
+    nuke.addOnCreate = add_callback('create')
+    nuke.addOnDestroy = add_callback('destroy')
+    nuke.addOnScriptClose = add_callback('close')
+    nuke.removeKnobChanged = remove_knob_changed
+
+    def all_nodes(filter=None, group=None, recurseGroups=False):
+        return [
+            node for node in _STATE['nodes'].values()
+            if filter is None or node.Class() == filter
+        ]
+
+    def delete(node):
+        _run_callbacks('destroy', node)
+        del _STATE['nodes'][node.fullName()]
+
+    def execute_in_main_thread(callback, args=(), kwargs=None):
+        return callback(*args)
+
+    def to_node(name):
+        if name.startswith('root.'):
+            name = name[len('root.'):]
+        return _STATE['nodes'].get(name)
+
+    nuke.activeViewer = lambda: None
+    nuke.allNodes = all_nodes
+    nuke.delete = delete
+    nuke.executeInMainThread = execute_in_main_thread
+    nuke.executeInMainThreadWithResult = execute_in_main_thread
+    nuke.layers = lambda node=None: list(node.layers)
+    nuke.root = _Root
+    nuke.selectedNodes = lambda filter=None: [
+        node for node in all_nodes(filter) if node.isSelected()
+    ]
+    nuke.thisGroup = _Root
+    nuke.thisKnob = lambda: _STATE['knob']
+    nuke.thisNode = lambda: _STATE['node']
+    nuke.toNode = to_node
+
+    return nuke
+
+# =============================================================================
+# PRIVATE FUNCTIONS
+# =============================================================================
+
+
+def _setup_group(viewer_sync, viewers):
+    """Syncs all viewers and switches on the soaked toggles."""
+    viewer_sync.setup_sync(viewers)
+    for viewer in viewers:
+        for toggle in TOGGLES:
+            viewer['vs_' + toggle].setValue(True)
+
+# =============================================================================
+
+
+def _check_initial_alignment(viewer_sync, viewers):
+    """Checks that a new group starts aligned on its first viewer.
+
+    Args:
+        viewer_sync : (<module>)
+            The imported viewerSync package.
+
+        viewers : [<_Node>]
+            The viewers to sync. They're left synced with default toggles.
+
+    Returns:
+        [str]
+            A description of each failure. Empty if the check passed.
+
+    Raises:
+        N/A
+
+    """
+    viewer_sync.remove_callbacks()
+    # zoom_lock is synced by default.
+    for viewer in viewers:
+        viewer['zoom_lock'].setValue(viewer is viewers[0])
+    viewer_sync.setup_sync(viewers)
+
+    locks = [viewer['zoom_lock'].value() for viewer in viewers]
+    if locks != [True] * len(viewers):
+        return [
+            'new group not aligned on its first viewer: {locks}'.format(
+                locks=locks
+            )
+        ]
+    return []
+
+# =============================================================================
+
+
+def _check_layer_change(viewer_sync, viewers, read):
+    """Checks that channels sync follows layers added upstream.
+
+    The layers each viewer can show are cached. A layer added upstream,
+    without any rewiring, must still be synced to the viewers.
+
+    Args:
+        viewer_sync : (<module>)
+            The imported viewerSync package.
+
+        viewers : [<_Node>]
+            The synced viewers, syncing inputs and channels.
+
+        read : (<_Node>)
+            A node for the viewers to view.
+
+    Returns:
+        [str]
+            A description of each failure. Empty if the check passed.
+
+    Raises:
+        N/A
+
+    """
+    viewers[0].setInput(0, read)
+    viewers[0]['channels'].setValue('rgb')
+    viewers[0]['channels'].setValue('rgba')
+
+    read.layers.append('depth')
+    try:
+        viewers[0]['channels'].setValue('depth')
+        channels = [viewer['channels'].value() for viewer in viewers]
+    finally:
+        read.layers.remove('depth')
+        viewers[0]['channels'].setValue('rgba')
+
+    if channels != ['depth'] * len(viewers):
+        return [
+            'channels skipped a layer added upstream: {channels}'.format(
+                channels=channels
+            )
+        ]
+    return []
+
+# =============================================================================
+
+
+def _check_deferred_flush(viewer_sync, viewers):
+    """Checks that a deferred flush doesn't overwrite newer changes.
+
+    A flush writes every target directly. If those writes fanned out again
+    they'd be queued as syncs from the targets, and the next flush would
+    write the older value back over the caller's newer one.
+
+    Args:
+        viewer_sync : (<module>)
+            The imported viewerSync package.
+
+        viewers : [<_Node>]
+            The synced viewers.
+
+    Returns:
+        [str]
+            A description of each failure. Empty if the check passed.
+
+    Raises:
+        N/A
+
+    """
+    core = viewer_sync.viewerSync
+
+    def flush():
+        """Runs the pending flush now rather than on its timer."""
+        if core._FLUSH_TIMER is not None:
+            core._FLUSH_TIMER.cancel()
+        core._flush_deferred()
+
+    failures = []
+    core._DEFERRED_KNOBS.add('gain')
+    try:
+        viewers[0]['gain'].setValue(5.0)
+        flush()
+        viewers[0]['gain'].setValue(6.0)
+        flush()
+        gains = [viewer['gain'].value() for viewer in viewers]
+        if gains != [6.0] * len(viewers):
+            failures.append(
+                'deferred flush overwrote a newer gain: {gains}'.format(
+                    gains=gains
+                )
+            )
+        if core._PENDING_SYNCS:
+            failures.append(
+                'deferred flush queued echoes: {pending}'.format(
+                    pending=sorted(core._PENDING_SYNCS)
+                )
+            )
+    finally:
+        core._DEFERRED_KNOBS.discard('gain')
+        core._PENDING_SYNCS.clear()
+        core._OVER_BUDGET.clear()
+        core._UNDER_BUDGET.clear()
+
+    return failures
+
+# =============================================================================
+
+
+def _cycle(viewer_sync, nuke, viewers, legacy, i):
+    """Tears the group down and rebuilds it, churning the viewer index.
+
+    Only the dispatcher group is rebuilt, the legacy group is left alone
+    as a script saved by an older viewerSync would be.
+
+    """
+    for viewer in viewers:
+        viewer.setSelected(True)
+    viewer_sync.remove_callbacks()
+    for viewer in viewers:
+        viewer.setSelected(False)
+    _setup_group(viewer_sync, viewers)
+
+    scratch = nuke.toNode('ScratchViewer') or _Node('ScratchViewer')
+    scratch['gain'].setValue(float(i))
+    nuke.delete(scratch)
+
+    with viewer_sync.sync_paused():
+        for step in range(10):
+            viewers[1]['gamma'].setValue(1.0 + step / 10.0)
+            viewers[2]['gain'].setValue(float(step))
+            legacy[1]['gain'].setValue(float(step))
+
+# =============================================================================
+
+
+def _drive(viewer_sync, nuke, viewers, legacy, reads, start, count, cycle,
+           record=None):
+    """Runs count iterations of knob changes on the first viewer of each group.
+
+    Args:
+        viewer_sync : (<module>)
+            The imported viewerSync package.
+
+        nuke : (<module>)
+            The stand-in nuke module.
+
+        viewers : [<_Node>]
+            The viewers synced through the knobChanged dispatcher.
+
+        legacy : [<_Node>]
+            The viewers synced through legacy callback strings.
+
+        reads : [<_Node>]
+            Nodes the viewers alternate between viewing.
+
+        start : (int)
+            The number of the first iteration.
+
+        count : (int)
+            The number of iterations to run.
+
+        cycle : (int)
+            Every this many iterations, the dispatcher group is rebuilt.
+
+        record=None : (callable)
+            If given, every knob change is made by calling record with the
+            change function and its value, so it can be measured.
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    caller = viewers[0]
+    legacy_caller = legacy[0]
+    for i in range(start, start + count):
+        changes = [
+            (caller['gain'].setValue, float(i % 50)),
+            (caller['roi'].setValue,
+             {'x': i % 7, 'y': 0, 'r': 1000, 't': 500}),
+            (caller['channels'].setValue, ['rgba', 'alpha'][i % 2]),
+            (lambda read: caller.setInput(0, read), reads[i % len(reads)]),
+            (legacy_caller['gain'].setValue, float(i % 50)),
+            (legacy_caller['roi'].setValue,
+             {'x': i % 7, 'y': 0, 'r': 1000, 't': 500}),
+        ]
+        for change, value in changes:
+            if record is None:
+                change(value)
+            else:
+                record(change, value)
+
+        if i and not i % cycle:
+            _cycle(viewer_sync, nuke, viewers, legacy, i)
+
+# =============================================================================
+
+
+def _setup_legacy_group(viewer_sync, viewers):
+    """Links viewers with callback strings, as older viewerSyncs did.
+
+    Each viewer gets the sync knobs and a knobChanged script calling
+    `viewerSync.sync_viewers()` with the names of the others, which drives
+    the `sync_viewers` and `_listed_targets` path rather than the
+    dispatcher.
+
+    """
+    for viewer in viewers:
+        viewer_sync.viewerSync._add_sync_knobs(viewer)
+    for viewer in viewers:
+        names = [
+            other.fullName() for other in viewers if other is not viewer
+        ]
+        viewer['knobChanged'].setValue(
+            'viewerSync.sync_viewers({viewers})'.format(viewers=names)
+        )
+    for viewer in viewers:
+        for toggle in TOGGLES:
+            if toggle != 'inputs':
+                viewer['vs_' + toggle].setValue(True)
+
+# =============================================================================
+
+
+def _timer(durations):
+    """Returns a record function appending the duration of each change."""
+    def record(change, value):
+        started = time.time()
+        change(value)
+        durations.append(time.time() - started)
+    return record
+
+# =============================================================================
+
+
+def _tracer(allocations):
+    """Returns a record function appending the bytes each change allocates.
+
+    The figure is the traced memory peak during the change, over the traced
+    memory before it, so it counts what is allocated and freed again within
+    the callback as well as what it keeps.
+
+    """
+    def record(change, value):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        change(value)
+        allocations.append(tracemalloc.get_traced_memory()[1] - before)
+    return record
+
+# =============================================================================
+
+
+def _parse_args(argv):
+    """Parses the command line options."""
+    parser = argparse.ArgumentParser(
+        description='Soak test viewerSync with a stand-in nuke module.'
+    )
+    parser.add_argument(
+        '--iterations', type=int, default=ITERATIONS,
+        help='Iterations to run after the warm up.'
+    )
+    parser.add_argument(
+        '--warm-up', type=int, default=WARM_UP,
+        help='Iterations to run before measuring.'
+    )
+    parser.add_argument(
+        '--cycle', type=int, default=CYCLE,
+        help='Iterations between rebuilds of the synced group.'
+    )
+    parser.add_argument(
+        '--callback-limit', type=float, default=CALLBACK_LIMIT,
+        help='Maximum mean seconds per knob change callback.'
+    )
+    parser.add_argument(
+        '--allocation-limit', type=int, default=ALLOCATION_LIMIT,
+        help='Maximum mean bytes allocated per knob change callback.'
+    )
+    parser.add_argument(
+        '--growth-limit', type=int, default=GROWTH_LIMIT,
+        help='Maximum bytes of retained memory growth.'
+    )
+    return parser.parse_args(argv)
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+
+def main(argv=None):
+    """Runs the soak and returns the exit status.
+
+    After the warm up, the run is repeated from the same warm state: once
+    timed, once between two tracemalloc snapshots, and once measuring the
+    allocations of each callback, so that tracing overhead doesn't count
+    against the callback limit.
+
+    Args:
+        argv=None : ([str])
+            Command line arguments. Defaults to sys.argv.
+
+    Returns:
+        (int)
+            0 if every limit held, 1 if any was exceeded.
+
+    Raises:
+        N/A
+
+    """
+    args = _parse_args(argv)
+    if tracemalloc is None or not hasattr(tracemalloc, 'reset_peak'):
+        print('The soak test needs tracemalloc.reset_peak (Python 3.9+).')
+        return 2
+
+    nuke = _stand_in_nuke()
+    sys.modules['nuke'] = nuke
+    sys.path.insert(
+        0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    import viewerSync as viewer_sync
+
+    for i in range(PADDING_NODES):
+        _Node('Grade{0}'.format(i + 1), 'Grade')
+    reads = [_Node('Read1', 'Read'), _Node('Read2', 'Read')]
+    reads[1].node_format = _Format(3840, 2160)
+    viewers = [
+        _Node('Viewer{0}'.format(i + 1)) for i in range(VIEWER_COUNT)
+    ]
+    legacy = [
+        _Node('LegacyViewer{0}'.format(i + 1)) for i in range(VIEWER_COUNT)
+    ]
+
+    # Checked before the legacy group exists, as it unlinks every viewer.
+    failures = _check_initial_alignment(viewer_sync, viewers)
+    _setup_group(viewer_sync, viewers)
+    _setup_legacy_group(viewer_sync, legacy)
+    failures.extend(_check_deferred_flush(viewer_sync, viewers))
+    failures.extend(_check_layer_change(viewer_sync, viewers, reads[0]))
+
+    _drive(
+        viewer_sync, nuke, viewers, legacy, reads, 0, args.warm_up,
+        args.cycle
+    )
+
+    durations = []
+    _drive(
+        viewer_sync, nuke, viewers, legacy, reads, args.warm_up,
+        args.iterations, args.cycle, _timer(durations)
+    )
+    mean = sum(durations) / len(durations)
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    _drive(
+        viewer_sync, nuke, viewers, legacy, reads,
+        args.warm_up + args.iterations, args.iterations, args.cycle
+    )
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+
+    allocations = []
+    _drive(
+        viewer_sync, nuke, viewers, legacy, reads,
+        args.warm_up + args.iterations * 2, args.iterations, args.cycle,
+        _tracer(allocations)
+    )
+    tracemalloc.stop()
+    allocation = sum(allocations) / float(len(allocations))
+
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    stats = after.filter_traces(ignore).compare_to(
+        before.filter_traces(ignore), 'lineno'
+    )
+    growth = sum([stat.size_diff for stat in stats])
+
+    print('knob changes per run: {count}'.format(count=len(durations)))
+    print(
+        'callback mean: {mean:.3f}ms, max: {max:.3f}ms, '
+        'limit: {limit:.3f}ms'.format(
+            mean=mean * 1000, max=max(durations) * 1000,
+            limit=args.callback_limit * 1000
+        )
+    )
+    print(
+        'allocation per callback mean: {mean:.0f} bytes, max: {max} bytes, '
+        'limit: {limit} bytes'.format(
+            mean=allocation, max=max(allocations),
+            limit=args.allocation_limit
+        )
+    )
+    print(
+        'retained growth: {growth} bytes, limit: {limit} bytes'.format(
+            growth=growth, limit=args.growth_limit
+        )
+    )
+
+    failed = False
+    for failure in failures:
+        print('FAIL: {failure}'.format(failure=failure))
+        failed = True
+    if mean > args.callback_limit:
+        print('FAIL: knob change callbacks are over the time limit.')
+        failed = True
+    if allocation > args.allocation_limit:
+        print('FAIL: knob change callbacks allocate over the limit.')
+        failed = True
+    if growth > args.growth_limit:
+        print('FAIL: retained memory grew over the limit. Top growth:')
+        for stat in stats[:10]:
+            print('    {stat}'.format(stat=stat))
+        failed = True
+
+    if failed:
+        return 1
+    print('OK')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -18,6 +18,10 @@ are selectable from a new 'Viewer Sync' tab in the Viewer settings. You can
 choose to sync channels, inputs, viewed input number, luts, input processes,
 color corrections, overlays, ROI, and more.
 
+Each viewer's tab decides both what it sends and what it receives, so a
+viewer only takes on a setting from the others when that setting is ticked on
+its own tab too.
+
 To remove the synchronization from nodes, select the nodes you wish to remove
 synchronization from, and select 'Remove Viewer Sync'. If no nodes are
 selected, all the viewers found on the root node graph level are de-synced.
@@ -78,7 +82,10 @@ except ImportError:
     pass
 
 # viewerSync Imports
-from .viewerSync import remove_callbacks, setup_sync, sync_viewers
+from .viewerSync import (
+    _install_dispatcher, deferred_knobs, pause_sync, remove_callbacks,
+    resume_sync, setup_sync, sync_paused, sync_viewers
+)
 
 # ==============================================================================
 # GLOBALS
@@ -102,9 +109,13 @@ __url__ = "http://github.com/ThoriumGroup/viewerSync"
 # ==============================================================================
 
 __all__ = [
+    'deferred_knobs',
+    'pause_sync',
     'remove_callbacks',
+    'resume_sync',
     'run',
     'setup_sync',
+    'sync_paused',
     'sync_viewers',
 ]
 
@@ -180,6 +191,10 @@ def run(menu='Viewer', hotkey='Shift+j', submenu=None, submenu_index=None,
         N/A
 
     """
+    # Synced viewers in scripts opened from now on need the dispatcher
+    # registered before their first knob change.
+    _install_dispatcher()
+
     # Find and setup our top level menu
     top_level_menu = nuke.menu('Nuke').findItem(menu)
     if not top_level_menu:
@@ -0,0 +1,918 @@
+#!/usr/bin/env python
+"""
+
+Viewer Sync Bridge
+==================
+
+Publishes the knob changes of a viewerSync group to viewerSync groups in
+other Nuke sessions, such as a second session driving a client monitor.
+
+Each bridge ties one local group to a channel name. Only that group's changes
+are published, and changes received on the channel are only applied to that
+group's members, so independent groups (like a left and a right eye) stay
+independent.
+
+Knob changes are coalesced per knob and sent in small batches. Each batch is
+one binary frame: a fixed header carrying a sequence number and a timestamp,
+followed by a compact tagged payload. Frames travel over TCP or Unix sockets
+through a hub that relays every frame to all other connected sessions.
+
+## Public Classes
+
+    BridgeClient
+        Connects a session to a hub, batching outgoing knob changes and
+        applying incoming ones.
+
+    LocalHub
+        A minimal in-process relay, for testing or for sessions on a single
+        machine.
+
+## Public Functions
+
+    bridge_latency()
+        Returns propagation latency statistics for a group's bridge.
+
+    decode_frame()
+        Decodes a binary frame into its header fields and deltas.
+
+    encode_frame()
+        Encodes a batch of knob deltas into a binary frame.
+
+    start_bridge()
+        Connects a viewerSync group to a channel on a hub.
+
+    stop_bridge()
+        Disconnects a viewerSync group, or all of them, from the hub.
+
+## License
+
+The MIT License (MIT)
+
+viewerSync
+Copyright (c) 2011-2014 Philippe Huberdeau and Sean Wallitsch
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+# =============================================================================
+# IMPORTS
+# =============================================================================
+
+# Standard Imports
+import random
+import socket
+import struct
+import threading
+import time
+
+# Nuke Imports
+try:
+    import nuke
+except ImportError:
+    pass
+
+# viewerSync Imports
+from . import viewerSync as _viewer_sync
+
+# =============================================================================
+# GLOBALS
+# =============================================================================
+
+# Every frame starts with this header:
+#   magic, version, flags, delta count, sequence, sender id, sent time,
+#   payload length
+FRAME_HEADER = struct.Struct('!4sBBHIIdI')
+FRAME_MAGIC = b'VSYN'
+FRAME_VERSION = 1
+
+# Knobs that are never published. Inputs are meaningless in another script.
+# ROIs are mapped into the format each viewer views, but frames don't carry
+# the sender's format, so a received ROI couldn't be mapped.
+LOCAL_ONLY_KNOBS = ['inputs', 'roi']
+
+# Seconds to wait after the first change of a batch before sending it. Any
+# further changes to the same knob within that window replace the queued
+# value rather than adding to the frame.
+DEFAULT_INTERVAL = 0.05
+
+# Payload type tags, one byte each.
+_TAG_NONE = b'N'
+_TAG_TRUE = b'T'
+_TAG_FALSE = b'F'
+_TAG_INT = b'i'
+_TAG_FLOAT = b'f'
+_TAG_STR = b's'
+_TAG_LIST = b'l'
+_TAG_DICT = b'm'
+
+_INT = struct.Struct('!q')
+_FLOAT = struct.Struct('!d')
+_LENGTH = struct.Struct('!I')
+
+# How many peer sessions a client tracks sequence numbers for. Peers get a
+# new id every time they connect, so the oldest are forgotten past this.
+MAX_TRACKED_SENDERS = 64
+
+# =============================================================================
+# EXPORTS
+# =============================================================================
+
+__all__ = [
+    'BridgeClient',
+    'LocalHub',
+    'bridge_latency',
+    'decode_frame',
+    'encode_frame',
+    'start_bridge',
+    'stop_bridge',
+]
+
+# =============================================================================
+# PRIVATE FUNCTIONS
+# =============================================================================
+
+
+def _apply_deltas(client, group_id, deltas):
+    """Applies remote knob deltas to the members of a bridged group.
+
+    Only members that have the matching toggle turned on are updated,
+    exactly as if the change had come from a linked viewer in this session.
+    Every member is written to directly, so viewerSync's own callbacks are
+    suppressed for the duration, and the writes neither fan out again nor
+    get queued as deferred syncs that would later publish the change back
+    to the hub.
+
+    Must run on Nuke's main thread: the client's `applying` flag is raised
+    for the duration too, while changes the user makes before or after are
+    still published.
+
+    Args:
+        client : (<BridgeClient>)
+            The client the deltas were received by.
+
+        group_id : (str)
+            The id of the local group bridged by client.
+
+        deltas : {str: object}
+            Knob names and the values to set them to.
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    if not _viewer_sync._INDEX_BUILT:
+        _viewer_sync._build_viewer_index()
+    viewers = [
+        _viewer_sync._VIEWER_INDEX[name]
+        for name in _viewer_sync._GROUPS.get(group_id, ())
+        if name in _viewer_sync._VIEWER_INDEX
+    ]
+
+    client.applying = True
+    _viewer_sync._SUPPRESSED += 1
+    try:
+        for knob, value in deltas.items():
+            for viewer in viewers:
+                try:
+                    if not _viewer_sync._sync_enabled(viewer, knob):
+                        continue
+                    viewer[knob].setValue(value)
+                except NameError:
+                    # Knob doesn't exist on this viewer.
+                    continue
+    finally:
+        _viewer_sync._SUPPRESSED -= 1
+        client.applying = False
+
+# =============================================================================
+
+
+def _decode_value(data, offset):
+    """Decodes a single tagged value starting at offset.
+
+    Args:
+        data : (bytes)
+            The payload being decoded.
+
+        offset : (int)
+            The position of the value's type tag within data.
+
+    Returns:
+        (object, int)
+            The decoded value and the offset just past it.
+
+    Raises:
+        ValueError
+            If an unknown type tag is found.
+
+    """
+    tag = data[offset:offset + 1]
+    offset += 1
+
+    if tag == _TAG_NONE:
+        return None, offset
+    elif tag == _TAG_TRUE:
+        return True, offset
+    elif tag == _TAG_FALSE:
+        return False, offset
+    elif tag == _TAG_INT:
+        return _INT.unpack_from(data, offset)[0], offset + _INT.size
+    elif tag == _TAG_FLOAT:
+        return _FLOAT.unpack_from(data, offset)[0], offset + _FLOAT.size
+
+    length = _LENGTH.unpack_from(data, offset)[0]
+    offset += _LENGTH.size
+
+    if tag == _TAG_STR:
+        text = data[offset:offset + length].decode('utf-8')
+        return text, offset + length
+    elif tag == _TAG_LIST:
+        items = []
+        for i in range(length):
+            item, offset = _decode_value(data, offset)
+            items.append(item)
+        return items, offset
+    elif tag == _TAG_DICT:
+        items = {}
+        for i in range(length):
+            key, offset = _decode_value(data, offset)
+            items[key], offset = _decode_value(data, offset)
+        return items, offset
+
+    raise ValueError('Unknown payload tag: {tag!r}'.format(tag=tag))
+
+# =============================================================================
+
+
+def _encode_value(value, chunks):
+    """Appends the tagged binary form of value to chunks.
+
+    Args:
+        value : (None|bool|int|float|str|list|tuple|dict)
+            The knob value to encode. Tuples are encoded as lists.
+
+        chunks : [bytes]
+            The list the encoded bytes are appended to.
+
+    Returns:
+        None
+
+    Raises:
+        TypeError
+            If value is of a type the frame format can't carry.
+
+    """
+    if value is None:
+        chunks.append(_TAG_NONE)
+    elif value is True:
+        chunks.append(_TAG_TRUE)
+    elif value is False:
+        chunks.append(_TAG_FALSE)
+    elif isinstance(value, int):
+        chunks.append(_TAG_INT + _INT.pack(value))
+    elif isinstance(value, float):
+        chunks.append(_TAG_FLOAT + _FLOAT.pack(value))
+    elif isinstance(value, (list, tuple)):
+        chunks.append(_TAG_LIST + _LENGTH.pack(len(value)))
+        for item in value:
+            _encode_value(item, chunks)
+    elif isinstance(value, dict):
+        chunks.append(_TAG_DICT + _LENGTH.pack(len(value)))
+        for key in sorted(value):
+            _encode_value(key, chunks)
+            _encode_value(value[key], chunks)
+    else:
+        if not isinstance(value, bytes):
+            try:
+                value = value.encode('utf-8')
+            except AttributeError:
+                raise TypeError(
+                    'Cannot encode {type} values.'.format(
+                        type=type(value).__name__
+                    )
+                )
+        chunks.append(_TAG_STR + _LENGTH.pack(len(value)) + value)
+
+# =============================================================================
+
+
+def _recv_exact(sock, size):
+    """Reads exactly size bytes from sock.
+
+    Args:
+        sock : (<socket.socket>)
+            A connected socket.
+
+        size : (int)
+            The number of bytes to read.
+
+    Returns:
+        (bytes|None)
+            The bytes read, or None if the connection closed first.
+
+    Raises:
+        N/A
+
+    """
+    chunks = []
+    while size:
+        try:
+            chunk = sock.recv(size)
+        except socket.error:
+            return None
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+# =============================================================================
+
+
+def _recv_frame(sock):
+    """Reads one complete raw frame from sock.
+
+    Args:
+        sock : (<socket.socket>)
+            A connected socket.
+
+    Returns:
+        (bytes|None)
+            The header and payload of the frame, or None if the connection
+            closed.
+
+    Raises:
+        ValueError
+            If the data read does not start with a viewerSync frame header.
+
+    """
+    header = _recv_exact(sock, FRAME_HEADER.size)
+    if header is None:
+        return None
+    if header[:len(FRAME_MAGIC)] != FRAME_MAGIC:
+        raise ValueError('Not a viewerSync frame.')
+    length = FRAME_HEADER.unpack(header)[-1]
+    payload = _recv_exact(sock, length)
+    if payload is None:
+        return None
+    return header + payload
+
+# =============================================================================
+
+
+def _group_id(group):
+    """Resolves the group argument of the public functions to a group id.
+
+    Args:
+        group : (str|<nuke.nodes.Viewer>|None)
+            A group id, a member of the group, or None for the group of the
+            active viewer.
+
+    Returns:
+        (str)
+
+    Raises:
+        ValueError
+            If no group was given and there is no active viewer, or if the
+            viewer isn't a member of any viewerSync group.
+
+    """
+    if isinstance(group, str):
+        return group
+
+    viewer = group
+    if viewer is None:
+        active_viewer = nuke.activeViewer()
+        if not active_viewer:
+            raise ValueError('No group given and no active viewer found.')
+        viewer = active_viewer.node()
+
+    if not _viewer_sync._INDEX_BUILT:
+        _viewer_sync._build_viewer_index()
+    group_id = _viewer_sync._MEMBERSHIP.get(viewer.fullName())
+    if group_id is None:
+        raise ValueError(
+            '{viewer} is not in a viewerSync group.'.format(
+                viewer=viewer.fullName()
+            )
+        )
+    return group_id
+
+# =============================================================================
+
+
+def _make_socket(address):
+    """Creates an unconnected socket suited to the given address.
+
+    Args:
+        address : (str|(str, int))
+            A filepath for a Unix socket, or a (host, port) tuple for TCP.
+
+    Returns:
+        <socket.socket>
+
+    Raises:
+        N/A
+
+    """
+    if isinstance(address, tuple):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+    return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+# =============================================================================
+# PUBLIC FUNCTIONS
+# =============================================================================
+
+
+def decode_frame(frame):
+    """Decodes a binary frame into its header fields and deltas.
+
+    Args:
+        frame : (bytes)
+            A complete frame, as produced by `encode_frame()`.
+
+    Returns:
+        {str: object}
+            A dictionary with `seq`, `sender`, `sent`, `channel` and `deltas`
+            keys. `deltas` maps knob names to their new values.
+
+    Raises:
+        ValueError
+            If frame is not a viewerSync frame of a supported version.
+
+    """
+    (magic, version, flags, count, seq, sender, sent,
+     length) = FRAME_HEADER.unpack_from(frame)
+
+    if magic != FRAME_MAGIC:
+        raise ValueError('Not a viewerSync frame.')
+    if version != FRAME_VERSION:
+        raise ValueError(
+            'Unsupported frame version: {version}'.format(version=version)
+        )
+
+    payload, offset = _decode_value(frame, FRAME_HEADER.size)
+    channel, deltas = payload
+
+    return {
+        'seq': seq,
+        'sender': sender,
+        'sent': sent,
+        'channel': channel,
+        'deltas': deltas,
+    }
+
+# =============================================================================
+
+
+def encode_frame(seq, sender, channel, deltas, sent=None):
+    """Encodes a batch of knob deltas into a binary frame.
+
+    Args:
+        seq : (int)
+            The sender's sequence number for this frame.
+
+        sender : (int)
+            An id unique to the sending session.
+
+        channel : (str)
+            The name shared by all sessions that should receive this frame.
+
+        deltas : {str: object}
+            Knob names and their new values.
+
+        sent=None : (float)
+            The time the oldest change in this batch was made. Defaults to
+            now.
+
+    Returns:
+        (bytes)
+            The encoded frame.
+
+    Raises:
+        TypeError
+            If a delta value can't be carried by the frame format.
+
+    """
+    if sent is None:
+        sent = time.time()
+
+    chunks = []
+    _encode_value([channel, deltas], chunks)
+    payload = b''.join(chunks)
+
+    header = FRAME_HEADER.pack(
+        FRAME_MAGIC, FRAME_VERSION, 0, len(deltas), seq, sender, sent,
+        len(payload)
+    )
+    return header + payload
+
+# =============================================================================
+
+
+def bridge_latency(group=None):
+    """Returns propagation latency statistics for a group's bridge.
+
+    Args:
+        group=None : (str|<nuke.nodes.Viewer>)
+            A group id, or a member of the group. Defaults to the group of
+            the active viewer.
+
+    Returns:
+        {str: float}|None
+            See `BridgeClient.latency()`. None if the group isn't bridged.
+
+    Raises:
+        ValueError
+            If no group was given and there is no active viewer, or if the
+            viewer isn't a member of any viewerSync group.
+
+    """
+    client = _viewer_sync._BRIDGES.get(_group_id(group))
+    if client is None:
+        return None
+    return client.latency()
+
+# =============================================================================
+
+
+def start_bridge(address, group=None, channel='default',
+                 interval=DEFAULT_INTERVAL):
+    """Connects a viewerSync group to a channel on a hub.
+
+    From this point on, every knob change that viewerSync propagates within
+    the group is also published to the channel, and every change published
+    by a peer on the same channel is applied to the group's members. Other
+    groups in this session are left alone. Any bridge the group already had
+    is stopped first.
+
+    Args:
+        address : (str|(str, int))
+            A filepath for a Unix socket, or a (host, port) tuple for TCP.
+
+        group=None : (str|<nuke.nodes.Viewer>)
+            A group id, or a member of the group to bridge. Defaults to the
+            group of the active viewer.
+
+        channel='default' : (str)
+            Only sessions sharing a channel name exchange changes. Bridge
+            each independent group on a channel of its own.
+
+        interval=DEFAULT_INTERVAL : (float)
+            Seconds changes are held for coalescing before being sent.
+
+    Returns:
+        <BridgeClient>
+
+    Raises:
+        socket.error
+            If the hub can't be reached.
+
+        ValueError
+            If no group was given and there is no active viewer, or if the
+            viewer isn't a member of any viewerSync group.
+
+    """
+    group_id = _group_id(group)
+    stop_bridge(group_id)
+
+    def apply_in_main_thread(deltas):
+        """Applies deltas on Nuke's main thread, waiting until done."""
+        nuke.executeInMainThreadWithResult(
+            _apply_deltas, args=(client, group_id, deltas)
+        )
+
+    client = BridgeClient(
+        address, channel=channel, interval=interval,
+        on_deltas=apply_in_main_thread
+    )
+    _viewer_sync._BRIDGES[group_id] = client
+
+    return client
+
+# =============================================================================
+
+
+def stop_bridge(group=None):
+    """Disconnects a viewerSync group, or all of them, from the hub.
+
+    Any batch still waiting to be sent is flushed first.
+
+    Args:
+        group=None : (str|<nuke.nodes.Viewer>)
+            A group id, or a member of the group to disconnect. Defaults to
+            every bridged group.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError
+            If a viewer was given that isn't a member of any viewerSync
+            group.
+
+    """
+    if group is None:
+        group_ids = list(_viewer_sync._BRIDGES)
+    else:
+        group_ids = [_group_id(group)]
+
+    for group_id in group_ids:
+        client = _viewer_sync._BRIDGES.pop(group_id, None)
+        if client is not None:
+            client.close()
+
+# =============================================================================
+# CLASSES
+# =============================================================================
+
+
+class BridgeClient(object):
+    """Connects a session to a hub, batching outgoing knob changes.
+
+    Outgoing changes are queued with `publish()`. The first change of a batch
+    starts a timer, and when it fires all queued changes are sent as a single
+    frame. Queuing a knob that is already waiting replaces its value.
+
+    Incoming frames from other senders on our channel are passed to
+    `on_deltas`. Frames that arrive out of order, and frames that can't be
+    decoded, are dropped. An exception raised by `on_deltas` is reported
+    and the frame skipped, the client keeps receiving.
+
+    Args:
+        address : (str|(str, int))
+            A filepath for a Unix socket, or a (host, port) tuple for TCP.
+
+        channel='default' : (str)
+            Only clients sharing a channel name exchange changes.
+
+        interval=DEFAULT_INTERVAL : (float)
+            Seconds changes are held for coalescing before being sent.
+
+        on_deltas=None : (callable)
+            Called with a {knob: value} dictionary for every accepted
+            incoming frame, from the client's receiving thread.
+
+    Raises:
+        socket.error
+            If the hub can't be reached.
+
+    """
+
+    def __init__(self, address, channel='default', interval=DEFAULT_INTERVAL,
+                 on_deltas=None):
+        self.channel = channel
+        self.interval = interval
+        self.on_deltas = on_deltas
+        # Set by whatever applies incoming changes, while it does so, so
+        # that they aren't echoed back. See `_apply_deltas`.
+        self.applying = False
+
+        self._sender = random.randint(1, 0xFFFFFFFF)
+        self._seq = 0
+        self._last_seq = {}
+        self._sender_order = []
+        self._pending = {}
+        self._pending_since = None
+        self._timer = None
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+
+        self._latency_count = 0
+        self._latency_last = 0.0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+        self._sock = _make_socket(address)
+        self._sock.connect(address)
+
+        self._reader = threading.Thread(target=self._read_loop)
+        self._reader.daemon = True
+        self._reader.start()
+
+    def close(self):
+        """Flushes any pending changes and disconnects from the hub."""
+        self.flush()
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self._sock.close()
+
+    def flush(self):
+        """Sends all queued changes as one frame, if there are any."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            deltas, self._pending = self._pending, {}
+            sent, self._pending_since = self._pending_since, None
+            self._seq = (self._seq + 1) & 0xFFFFFFFF
+            seq = self._seq
+
+        frame = encode_frame(seq, self._sender, self.channel, deltas, sent)
+        with self._send_lock:
+            try:
+                self._sock.sendall(frame)
+            except socket.error:
+                # The hub went away, there's nobody left to tell.
+                pass
+
+    def latency(self):
+        """Returns end-to-end propagation latency statistics.
+
+        Latency is measured from the first change of a batch in the sending
+        session to the moment the receiving session finished applying it,
+        so it includes coalescing delay. Sessions on different machines need
+        synchronized clocks for the figures to be meaningful.
+
+        Returns:
+            {str: float}
+                `count` of frames applied, and the `last`, `mean` and `max`
+                latency in seconds.
+
+        """
+        count = self._latency_count
+        return {
+            'count': count,
+            'last': self._latency_last,
+            'mean': self._latency_total / count if count else 0.0,
+            'max': self._latency_max,
+        }
+
+    def publish(self, knob, value):
+        """Queues a knob change to be sent with the next batch."""
+        if knob in LOCAL_ONLY_KNOBS:
+            return
+        with self._lock:
+            if self._pending_since is None:
+                self._pending_since = time.time()
+            self._pending[knob] = value
+            if self._timer is None:
+                self._timer = threading.Timer(self.interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _read_loop(self):
+        """Receives frames until the connection closes."""
+        while True:
+            try:
+                frame = _recv_frame(self._sock)
+            except ValueError:
+                frame = None
+            if frame is None:
+                return
+
+            try:
+                message = decode_frame(frame)
+            except (ValueError, TypeError, IndexError, struct.error) as err:
+                # A frame from a newer or broken peer. The framing itself
+                # was intact, so the next frame can still be read.
+                print(
+                    'viewerSync: dropping undecodable bridge frame: '
+                    '{err}'.format(err=err)
+                )
+                continue
+
+            try:
+                self._receive(message)
+            except Exception as err:
+                # Don't let one bad frame stop this session receiving.
+                print(
+                    'viewerSync: failed to apply bridge frame: '
+                    '{err}'.format(err=err)
+                )
+
+    def _receive(self, message):
+        """Applies an incoming decoded frame and records its latency."""
+        sender = message['sender']
+        if sender == self._sender or message['channel'] != self.channel:
+            return
+        if message['seq'] <= self._last_seq.get(sender, 0):
+            # Stale or duplicate batch.
+            return
+        if (sender not in self._last_seq and
+                len(self._last_seq) >= MAX_TRACKED_SENDERS):
+            self._last_seq.pop(self._sender_order.pop(0), None)
+        if sender not in self._last_seq:
+            self._sender_order.append(sender)
+        self._last_seq[sender] = message['seq']
+
+        if self.on_deltas is not None:
+            self.on_deltas(message['deltas'])
+
+        latency = time.time() - message['sent']
+        self._latency_count += 1
+        self._latency_last = latency
+        self._latency_total += latency
+        self._latency_max = max(self._latency_max, latency)
+
+# =============================================================================
+
+
+class LocalHub(object):
+    """A minimal relay that forwards every frame to all other clients.
+
+    This is a stand-in for a dedicated hub service. It runs in background
+    threads of the current process, so it can be started from a test, a
+    terminal session or one of the Nuke sessions taking part.
+
+    Args:
+        address=('127.0.0.1', 0) : (str|(str, int))
+            A filepath for a Unix socket, or a (host, port) tuple for TCP.
+            Port 0 picks a free port, see the `address` attribute.
+
+    """
+
+    def __init__(self, address=('127.0.0.1', 0)):
+        self._clients = []
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._server = _make_socket(address)
+        if isinstance(address, tuple):
+            self._server.setsockopt(
+                socket.SOL_SOCKET, socket.SO_REUSEADDR, 1
+            )
+        self._server.bind(address)
+        self._server.listen(8)
+        self.address = self._server.getsockname()
+        self.frames = 0
+
+        self._acceptor = threading.Thread(target=self._accept_loop)
+        self._acceptor.daemon = True
+        self._acceptor.start()
+
+    def close(self):
+        """Stops accepting clients and disconnects all current ones."""
+        try:
+            self._server.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self._server.close()
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            client.close()
+
+    def _accept_loop(self):
+        """Accepts clients until the server socket closes."""
+        while True:
+            try:
+                client, address = self._server.accept()
+            except socket.error:
+                return
+            with self._lock:
+                self._clients.append(client)
+            relay = threading.Thread(target=self._relay_loop, args=(client,))
+            relay.daemon = True
+            relay.start()
+
+    def _relay_loop(self, client):
+        """Forwards each frame from client to every other client."""
+        while True:
+            try:
+                frame = _recv_frame(client)
+            except ValueError:
+                frame = None
+            if frame is None:
+                break
+            self.frames += 1
+            with self._lock:
+                peers = [peer for peer in self._clients if peer is not client]
+            # Relays for different clients run in parallel, frames must not
+            # interleave on the way out.
+            with self._send_lock:
+                for peer in peers:
+                    try:
+                        peer.sendall(frame)
+                    except socket.error:
+                        continue
+
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+        client.close()
@@ -0,0 +1,405 @@
+#!/usr/bin/env python
+"""
+
+Viewer Sync Presets
+===================
+
+Captures the synced state of a viewer as an immutable snapshot, and applies
+snapshots to groups of viewers in a single batched operation.
+
+A snapshot holds the value of every knob listed in `SYNC_DEFAULTS`, a hash
+for each of those values and a digest of the whole snapshot. Applying a
+snapshot compares digests and hashes first, then the values themselves, so
+viewers and knobs that already match are never written to.
+
+## Public Classes
+
+    ViewerSnapshot
+        An immutable record of a viewer's synced knob values.
+
+## Public Functions
+
+    apply_preset()
+        Applies a named preset to a group of viewers.
+
+    apply_snapshot()
+        Applies a snapshot to a group of viewers as a single undo step.
+
+    capture_snapshot()
+        Captures the synced knob values of a viewer.
+
+    save_preset()
+        Captures a viewer's synced state and stores it under a name.
+
+## License
+
+The MIT License (MIT)
+
+viewerSync
+Copyright (c) 2011-2014 Philippe Huberdeau and Sean Wallitsch
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+# =============================================================================
+# IMPORTS
+# =============================================================================
+
+# Standard Imports
+import hashlib
+
+# Nuke Imports
+try:
+    import nuke
+except ImportError:
+    pass
+
+# viewerSync Imports
+from . import viewerSync as _viewer_sync
+
+# =============================================================================
+# GLOBALS
+# =============================================================================
+
+# Knobs in SYNC_DEFAULTS that describe node connections rather than knob
+# values, and so can't be part of a snapshot.
+CONNECTION_KNOBS = ['inputs']
+
+# Saved presets, keyed by name.
+PRESETS = {}
+
+# =============================================================================
+# EXPORTS
+# =============================================================================
+
+__all__ = [
+    'PRESETS',
+    'ViewerSnapshot',
+    'apply_preset',
+    'apply_snapshot',
+    'capture_snapshot',
+    'save_preset',
+]
+
+# =============================================================================
+# PRIVATE FUNCTIONS
+# =============================================================================
+
+
+def _freeze(value):
+    """Converts a knob value into a hashable equivalent.
+
+    Args:
+        value : (object)
+            A knob value. Lists and dicts (like those returned by array and
+            box knobs) are converted recursively.
+
+    Returns:
+        (object)
+            A hashable value. Dicts become a `_FrozenDict`, so that `_thaw`
+            can restore them.
+
+    Raises:
+        N/A
+
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple([_freeze(item) for item in value])
+    elif isinstance(value, dict):
+        return _FrozenDict(
+            sorted([(key, _freeze(item)) for key, item in value.items()])
+        )
+    return value
+
+# =============================================================================
+
+
+def _thaw(value):
+    """Converts a value made by `_freeze` back into one knobs accept.
+
+    Args:
+        value : (object)
+            A value returned by `_freeze`.
+
+    Returns:
+        (object)
+
+    Raises:
+        N/A
+
+    """
+    if isinstance(value, _FrozenDict):
+        return dict([(key, _thaw(item)) for key, item in value])
+    elif isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+# =============================================================================
+
+
+def _group_viewers():
+    """Returns the selected viewers and every viewer linked to them.
+
+    If no viewers are selected, all viewers at the current level are
+    returned.
+
+    Args:
+        N/A
+
+    Returns:
+        [<nuke.nodes.Viewer>]
+
+    Raises:
+        N/A
+
+    """
+    level = _viewer_sync._viewer_level(nuke.thisGroup())
+    viewers = _viewer_sync._indexed_viewers(level, selected=True)
+    if not viewers:
+        return _viewer_sync._indexed_viewers(level)
+
+    for viewer in list(viewers):
+        for linked_viewer in _viewer_sync._extract_viewer_list(viewer):
+            if linked_viewer not in viewers:
+                viewers.append(linked_viewer)
+
+    return viewers
+
+# =============================================================================
+# PUBLIC FUNCTIONS
+# =============================================================================
+
+
+def apply_preset(name, viewers=None):
+    """Applies a named preset to a group of viewers.
+
+    Args:
+        name : (str)
+            The name the preset was saved under.
+
+        viewers=None : ([<nuke.nodes.Viewer>])
+            The viewers to apply the preset to. Defaults to the selected
+            viewers and all viewers synced with them, or every viewer at the
+            current level if none are selected.
+
+    Returns:
+        (int)
+            The number of knobs that were written to.
+
+    Raises:
+        KeyError
+            If no preset has been saved under name.
+
+    """
+    if viewers is None:
+        viewers = _group_viewers()
+    return apply_snapshot(PRESETS[name], viewers)
+
+# =============================================================================
+
+
+def apply_snapshot(snapshot, viewers):
+    """Applies a snapshot to a group of viewers as a single undo step.
+
+    Viewers whose current state has the same digest as the snapshot are
+    skipped entirely. For the rest, only knobs whose value differs are
+    written. Knob hashes are compared first as a quick check, but as
+    different values can share a hash, matching hashes are confirmed by
+    comparing the values themselves. viewerSync's own callbacks are
+    suppressed for the duration, as every viewer of the group is written to
+    directly.
+
+    Args:
+        snapshot : (<ViewerSnapshot>)
+            The state to apply.
+
+        viewers : ([<nuke.nodes.Viewer>])
+            The viewers to apply the state to.
+
+    Returns:
+        (int)
+            The number of knobs that were written to.
+
+    Raises:
+        N/A
+
+    """
+    writes = 0
+
+    undo = nuke.Undo()
+    undo.begin('Apply Viewer Preset')
+    _viewer_sync._SUPPRESSED += 1
+    try:
+        for viewer in viewers:
+            current = capture_snapshot(viewer)
+            if current.digest == snapshot.digest:
+                continue
+            for knob, knob_hash in snapshot.knob_hashes.items():
+                if (current.knob_hashes.get(knob) == knob_hash and
+                        current.matches(snapshot, knob)):
+                    continue
+                try:
+                    viewer[knob].setValue(snapshot.value(knob))
+                except NameError:
+                    # Knob doesn't exist on this viewer.
+                    continue
+                writes += 1
+    finally:
+        _viewer_sync._SUPPRESSED -= 1
+        undo.end()
+
+    return writes
+
+# =============================================================================
+
+
+def capture_snapshot(viewer):
+    """Captures the synced knob values of a viewer.
+
+    Args:
+        viewer : (<nuke.nodes.Viewer>)
+            The viewer to capture. Knobs listed in `SYNC_DEFAULTS` that the
+            viewer lacks are left out of the snapshot.
+
+    Returns:
+        <ViewerSnapshot>
+
+    Raises:
+        N/A
+
+    """
+    values = {}
+    for knob in _viewer_sync.SYNC_DEFAULTS:
+        if knob in CONNECTION_KNOBS:
+            continue
+        try:
+            values[knob] = viewer[knob].value()
+        except NameError:
+            continue
+    return ViewerSnapshot(values)
+
+# =============================================================================
+
+
+def save_preset(name, viewer=None):
+    """Captures a viewer's synced state and stores it under a name.
+
+    Args:
+        name : (str)
+            The name to store the preset under, replacing any preset already
+            using that name.
+
+        viewer=None : (<nuke.nodes.Viewer>)
+            The viewer to capture. Defaults to the active viewer.
+
+    Returns:
+        <ViewerSnapshot>
+
+    Raises:
+        ValueError
+            If no viewer was given and there is no active viewer.
+
+    """
+    if viewer is None:
+        active_viewer = nuke.activeViewer()
+        if not active_viewer:
+            raise ValueError('No viewer given and no active viewer found.')
+        viewer = active_viewer.node()
+
+    snapshot = capture_snapshot(viewer)
+    PRESETS[name] = snapshot
+    return snapshot
+
+# =============================================================================
+# CLASSES
+# =============================================================================
+
+
+class _FrozenDict(tuple):
+    """A tuple of sorted (key, value) pairs standing in for a dict."""
+    __slots__ = ()
+
+# =============================================================================
+
+
+class ViewerSnapshot(object):
+    """An immutable record of a viewer's synced knob values.
+
+    Two snapshots with the same values have the same digest, regardless of
+    the viewer they were captured from.
+
+    Args:
+        values : {str: object}
+            Knob names and their values.
+
+    Attributes:
+        digest : (str)
+            A hex digest of the full snapshot contents.
+
+        knob_hashes : {str: int}
+            The hash of each knob's value.
+
+    """
+    __slots__ = ('_values', 'digest', 'knob_hashes')
+
+    def __init__(self, values):
+        frozen = tuple(
+            sorted([(knob, _freeze(value)) for knob, value in values.items()])
+        )
+        digest = hashlib.sha1(repr(frozen).encode('utf-8')).hexdigest()
+        knob_hashes = dict([(knob, hash(value)) for knob, value in frozen])
+
+        object.__setattr__(self, '_values', dict(frozen))
+        object.__setattr__(self, 'digest', digest)
+        object.__setattr__(self, 'knob_hashes', knob_hashes)
+
+    def __eq__(self, other):
+        if not isinstance(other, ViewerSnapshot):
+            return NotImplemented
+        return self.digest == other.digest
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __hash__(self):
+        return hash(self.digest)
+
+    def __repr__(self):
+        return '<ViewerSnapshot {digest}>'.format(digest=self.digest[:12])
+
+    def __setattr__(self, name, value):
+        raise AttributeError('ViewerSnapshot is immutable.')
+
+    def knobs(self):
+        """Returns the names of the knobs held by this snapshot."""
+        return sorted(self._values)
+
+    def matches(self, other, knob):
+        """Returns True if other holds the same value for knob as this does."""
+        if knob not in self._values or knob not in other._values:
+            return False
+        return self._values[knob] == other._values[knob]
+
+    def value(self, knob):
+        """Returns the value of knob, in a form its setValue accepts."""
+        return _thaw(self._values[knob])
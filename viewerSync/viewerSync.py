@@ -8,12 +8,24 @@ Contains the functions required for two views to be kept in sync.
 
 ## Public Functions
 
+    deferred_knobs()
+        Returns the knobs the latency watchdog has switched to deferred sync.
+
+    pause_sync()
+        Pauses viewerSync until a matching resume_sync().
+
     remove_callback()
         Removes callback from all selected viewers and all viewers linked.
 
+    resume_sync()
+        Resumes viewerSync after pause_sync(), reconciling once.
+
     setup_sync()
         Sets up a viewerSync between a group of Viewer nodes.
 
+    sync_paused()
+        Context manager pausing viewerSync for the duration of the block.
+
     sync_viewers()
         Syncs all the given viewers to the settings on the caller node.
 
@@ -50,6 +62,10 @@ SOFTWARE.
 
 # Standard Imports
 from ast import literal_eval
+from contextlib import contextmanager
+import threading
+import time
+import uuid
 
 # Nuke Imports
 try:
@@ -164,13 +180,134 @@ VIEWER_SYNC_KNOBS = [
     'vs_{knob}'.format(knob=sync_knob) for sync_knob in SYNC_DEFAULTS.keys()
 ]
 
+# How the per-viewer sync toggles are stored. With 'knobs', every synced
+# viewer gets a Viewer Sync tab holding a Boolean knob per toggle. With
+# 'bitmask', all toggles are packed into the single hidden `vs_mask` knob,
+# and the tab is only built while the viewer's properties panel is open.
+STORAGE_MODE = 'knobs'
+
+# The bit each toggle occupies in `vs_mask`. Saved scripts depend on this
+# order, so new knobs must only ever be appended.
+MASK_KNOBS = [
+    'channels', 'cliptest', 'downrez', 'format_center', 'gain', 'gamma',
+    'masking_mode', 'masking_ratio', 'overscan', 'ignore_pixel_aspect',
+    'input_number', 'input_process', 'input_process_node', 'inputs',
+    'rgb_only', 'roi', 'safe_zone', 'show_overscan', 'viewerInputOrder',
+    'viewerProcess', 'zoom_lock',
+]
+
+# The non-toggle knobs making up the Viewer Sync tab.
+SYNC_UI_KNOBS = [
+    'vs_input_options', 'vs_display_options', 'vs_overlay_options',
+    'vs_process_options',
+]
+
+# Decoded `vs_mask` values, as frozensets of enabled knobs keyed by mask.
+# Cleared when it reaches MASK_CACHE_LIMIT entries.
+_DECODED_MASKS = {}
+MASK_CACHE_LIMIT = 1024
+
+# The running `bridge.BridgeClient` of each viewerSync group bridged to other
+# sessions, keyed by group id. Managed by `bridge.start_bridge()` and
+# `bridge.stop_bridge()`.
+_BRIDGES = {}
+
+# While above zero, `sync_viewers` returns immediately. Used by operations
+# that already write every viewer of a group themselves, like applying a
+# preset, so that each of their writes doesn't fan out again.
+_SUPPRESSED = 0
+
+# While above zero, sync is paused: changes to synced knobs are only noted,
+# and `resume_sync` pushes each noted knob once. See `pause_sync`.
+_PAUSED = 0
+# Knobs changed while paused, keyed by (group, knob), with the name of the
+# viewer that changed the knob last as value. The group is a group id, or a
+# tuple of linked viewer names for viewers still on an old callback string.
+_PAUSED_CHANGES = {}
+
+# Nuke running without a GUI (`nuke -t`, renders and batch jobs) never
+# syncs, as nobody is looking at a viewer.
+try:
+    _HEADLESS = not nuke.GUI
+except NameError:
+    # Not running inside Nuke at all.
+    _HEADLESS = True
+
+# The latency watchdog times every knob sync done by `sync_viewers`. A knob
+# whose sync takes longer than LATENCY_BUDGET seconds LATENCY_STRIKES times
+# in a row is switched to deferred propagation: its changes are coalesced
+# and synced once every DEFERRED_INTERVAL seconds. Once the deferred syncs
+# come in under budget LATENCY_STRIKES times in a row, immediate sync is
+# restored.
+LATENCY_BUDGET = 0.05
+LATENCY_STRIKES = 3
+DEFERRED_INTERVAL = 0.25
+
+# Knobs currently on deferred propagation.
+_DEFERRED_KNOBS = set()
+# Consecutive over and under budget syncs per knob.
+_OVER_BUDGET = {}
+_UNDER_BUDGET = {}
+# Deferred syncs waiting to be flushed, keyed by (caller name, knob), with
+# the target viewer names as values.
+_PENDING_SYNCS = {}
+_FLUSH_TIMER = None
+
+# The layers available to each viewer, keyed by viewer name. Values are a
+# tuple of the viewed node's name and a frozenset of its layer names. An
+# entry is only used while the viewer still views that same node, and is
+# dropped whenever the viewer's inputs change. Upstream nodes can change
+# their layers without the viewer noticing, so an entry is only trusted to
+# say a layer exists: a target is never skipped without reading again.
+_LAYER_CACHE = {}
+
+# Scale factors that map ROI coordinates from one viewer format to another,
+# keyed by (source format, target format). Formats here include the viewer's
+# proxy scale, see `_viewer_format`. Cleared when it reaches ROI_CACHE_LIMIT
+# entries.
+_ROI_TRANSFORMS = {}
+ROI_CACHE_LIMIT = 256
+
+# Every Viewer node in the script, at any Group level, keyed by full name.
+# Built on first use by `_indexed_viewers`, then kept current by onCreate,
+# onDestroy and rename callbacks rather than by scanning the node graph.
+_VIEWER_INDEX = {}
+_INDEX_BUILT = False
+_INDEX_CALLBACKS_ADDED = False
+
+# viewerSync groups, keyed by the group id stored in the hidden `vs_group`
+# knob of each member, with sets of member viewer names as values. With
+# _MEMBERSHIP, which maps viewer names to their group id, these are kept
+# alongside the viewer index.
+_GROUPS = {}
+_MEMBERSHIP = {}
+
+# For each group, the members subscribed to each knob, as
+# {group id: {knob: set of viewer names}}. A group's entry is built from its
+# members' toggles the first time it fans out, updated in place when a
+# member's toggle changes, and dropped whenever the group's membership does.
+_SUBSCRIBERS = {}
+
+# The only knobs the knobChanged dispatcher does any work for. Any other knob
+# change on a Viewer costs a single set lookup.
+_SYNCED_KNOBS = frozenset(SYNC_DEFAULTS)
+_TOGGLE_KNOBS = frozenset(VIEWER_SYNC_KNOBS)
+_DISPATCH_KNOBS = _SYNCED_KNOBS | _TOGGLE_KNOBS | frozenset(
+    ['inputChange', 'showPanel', 'hidePanel', 'name']
+)
+_DISPATCHER_ADDED = False
+
 # =============================================================================
 # EXPORTS
 # =============================================================================
 
 __all__ = [
+    'deferred_knobs',
+    'pause_sync',
     'remove_callbacks',
+    'resume_sync',
     'setup_sync',
+    'sync_paused',
     'sync_viewers',
 ]
 
@@ -185,6 +322,9 @@ def _add_sync_knobs(viewer):
     If this gets called on a node that already has viewerSync knobs, those
     knobs will sync instead of being added again.
 
+    Depending on STORAGE_MODE, this either adds the full Viewer Sync tab or
+    only the hidden `vs_mask` knob.
+
     Args:
         viewer : (<nuke.nodes.Viewer>)
             The Viewer node to add viewerSync knobs to.
@@ -196,13 +336,41 @@ def _add_sync_knobs(viewer):
         N/A
 
     """
-    if 'vs_options' in viewer.knobs():
-        # This node already has a settings pane- we'll reset the settings to
+    if _has_sync_knobs(viewer):
+        # This node already has settings- we'll reset the settings to
         # default.
         for knob in SYNC_DEFAULTS:
-            viewer['vs_' + knob].setValue(SYNC_DEFAULTS[knob])
+            _set_toggle(viewer, knob, SYNC_DEFAULTS[knob])
         return
 
+    if STORAGE_MODE == 'bitmask':
+        mask = nuke.Int_Knob('vs_mask', 'viewerSync')
+        mask.setValue(_encode_mask(SYNC_DEFAULTS))
+        mask.setFlag(nuke.INVISIBLE)
+        viewer.addKnob(mask)
+    else:
+        _add_sync_ui(viewer, SYNC_DEFAULTS)
+
+# =============================================================================
+
+
+def _add_sync_ui(viewer, toggles):
+    """Adds the Viewer Sync tab and its toggle checkboxes to a viewer.
+
+    Args:
+        viewer : (<nuke.nodes.Viewer>)
+            The Viewer node to add the tab to.
+
+        toggles : {str: bool}
+            The value for each checkbox, keyed by the knob it syncs.
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
     tab = nuke.Tab_Knob('vs_options', 'Viewer Sync')
     viewer.addKnob(tab)
 
@@ -211,7 +379,7 @@ def _add_sync_knobs(viewer):
         for knob in knob_list:
             new_knob = nuke.Boolean_Knob('vs_' + knob, KNOB_TITLES[knob])
             new_knob.setTooltip(KNOB_TOOLTIPS[knob])
-            new_knob.setValue(SYNC_DEFAULTS[knob])
+            new_knob.setValue(toggles[knob])
             new_knob.setFlag(nuke.STARTLINE)
             viewer.addKnob(new_knob)
 
@@ -246,55 +414,52 @@ def _add_sync_knobs(viewer):
 # =============================================================================
 
 
-def _extract_viewer_list(viewer):
-    """Extracts a list of Viewer nodes from a callback.
+def _available_layers(viewer, refresh=False):
+    """Returns the layers available to a viewer from the node it views.
 
-    Searches a viewer node for a viewerSync callback, and extracts the
-    value of the `viewers` arg.
+    Results are cached per viewer, see `_LAYER_CACHE`.
 
     Args:
         viewer : (<nuke.nodes.Viewer>)
-            The viewer node with the callback attached.
+            The viewer to check.
+
+        refresh=False : (bool)
+            If True, the layers are read from the viewed node even if they
+            are cached, and the cache is updated.
 
     Returns:
-        [<nuke.nodes.Viewer>]
-            A list of viewer nodes that were listed in the callback arg.
+        (frozenset|None)
+            The layer names, or None if the viewer views nothing.
 
     Raises:
-        ValueError
-            If the callback found on the viewer is present, but not for
-            viewerSync.
+        N/A
 
     """
-    callback = viewer['knobChanged'].value()
-
-    if not callback:
-        return []
-    elif 'viewerSync' not in callback:
-        raise ValueError("Not a viewerSync'd viewer.")
+    node = _viewed_node(viewer)
+    if node is None:
+        return None
 
-    callback = callback.replace('viewerSync.sync_viewers(', '')[:-1]
-    linked_viewers = literal_eval(callback)
-    viewer_nodes = [
-        nuke.toNode(node) for node in linked_viewers if nuke.toNode(node)
-    ]
+    node_name = node.fullName()
+    cached = _LAYER_CACHE.get(viewer.fullName())
+    if not refresh and cached is not None and cached[0] == node_name:
+        return cached[1]
 
-    return viewer_nodes
+    layers = frozenset(nuke.layers(node))
+    _LAYER_CACHE[viewer.fullName()] = (node_name, layers)
+    return layers
 
 # =============================================================================
 
 
-def _remove_knobs(viewer):
-    """Removes all viewerSync knobs from a viewer.
+def _build_viewer_index():
+    """Fills the viewer index from the node graph and installs its callbacks.
 
-    Since this function only deletes knobs that begin with `vs_`, it should
-    not raise any exceptions due to missing nodes. One should be able
-    to run this on a Viewer- or any node for that matter- with no viewerSync
-    knobs on it whatsoever and not raise any errors.
+    This is the only place the whole node graph is walked. Group membership
+    is read from each viewer's `vs_group` knob on the way. The callbacks are
+    only ever installed once per session.
 
     Args:
-        viewer : (<nuke.nodes.Viewer>)
-            The viewer node with the viewerSync knobs on it.
+        N/A
 
     Returns:
         None
@@ -303,31 +468,74 @@ def _remove_knobs(viewer):
         N/A
 
     """
-    for knob in viewer.knobs():
-        if knob.startswith('vs_'):
-            viewer.removeKnob(viewer[knob])
-    # It's unlikely that the tab knob was deleted at first.
-    if 'vs_options' in viewer.knobs():
-        viewer.removeKnob(viewer['vs_options'])
+    global _INDEX_BUILT, _INDEX_CALLBACKS_ADDED
+
+    _VIEWER_INDEX.clear()
+    _GROUPS.clear()
+    _MEMBERSHIP.clear()
+    _SUBSCRIBERS.clear()
+    for viewer in nuke.allNodes('Viewer', nuke.root(), recurseGroups=True):
+        _VIEWER_INDEX[viewer.fullName()] = viewer
+        _join_group(viewer)
+    _INDEX_BUILT = True
+
+    if not _INDEX_CALLBACKS_ADDED:
+        nuke.addOnCreate(_index_created, nodeClass='Viewer')
+        nuke.addOnDestroy(_index_destroyed, nodeClass='Viewer')
+        # Viewer renames are caught by the dispatcher, but renaming a Group
+        # renames every viewer inside it.
+        nuke.addKnobChanged(_index_renamed, nodeClass='Group')
+        nuke.addOnScriptClose(_index_reset)
+        _install_dispatcher()
+        _INDEX_CALLBACKS_ADDED = True
 
 # =============================================================================
 
 
-def _sync_knob(source, targets, knob):
-    """Syncs a knob setting from the source to the target.
+def _decode_mask(mask):
+    """Returns the knobs whose toggle is set in a `vs_mask` value.
 
     Args:
-        source : (<nuke.Node>)
-            Any node that has a knob with a value we want to sync from.
+        mask : (int)
+            A `vs_mask` value.
 
-        targets : [<nuke.Node>]
-            A list of nodes that should have the same knob as source, that we
-            want to have the same value as source. The call to these nodes
-            and knobs is protected by a try/except, so even if the knob is
-            missing it should resolve without error.
+    Returns:
+        (frozenset)
+            The names of the knobs set to sync.
+
+    Raises:
+        N/A
+
+    """
+    toggles = _DECODED_MASKS.get(mask)
+    if toggles is None:
+        if len(_DECODED_MASKS) >= MASK_CACHE_LIMIT:
+            _DECODED_MASKS.clear()
+        toggles = frozenset(
+            [knob for i, knob in enumerate(MASK_KNOBS) if mask & (1 << i)]
+        )
+        _DECODED_MASKS[mask] = toggles
+    return toggles
+
+# =============================================================================
+
+
+def _defer_sync(caller, targets, knob):
+    """Queues a knob sync to be run with the next deferred flush.
+
+    A newer change from the same caller to the same knob replaces the queued
+    one, so however many changes arrive within DEFERRED_INTERVAL, only the
+    latest is synced.
+
+    Args:
+        caller : (<nuke.nodes.Viewer>)
+            The viewer the knob value will be synced from.
+
+        targets : [<nuke.nodes.Viewer>]
+            The viewers to sync the knob value to.
 
         knob : (str)
-            The knob name to match between the source and the targets.
+            The knob to sync.
 
     Returns:
         None
@@ -336,25 +544,35 @@ def _sync_knob(source, targets, knob):
         N/A
 
     """
-    for target in targets:
-        try:
-            target[knob].setValue(source[knob].value())
-        except NameError:
-            # Knob doesn't exist on target.
-            continue
+    global _FLUSH_TIMER
+
+    _PENDING_SYNCS[(caller.fullName(), knob)] = [
+        target.fullName() for target in targets
+    ]
+
+    if _FLUSH_TIMER is None:
+        _FLUSH_TIMER = threading.Timer(
+            DEFERRED_INTERVAL, nuke.executeInMainThread, [_flush_deferred]
+        )
+        _FLUSH_TIMER.daemon = True
+        _FLUSH_TIMER.start()
 
 # =============================================================================
 
 
-def _set_callback(node, viewers):
-    """Sets the callback on the node with the viewers and knobs args.
+def _dispatch_knob_changed():
+    """The knobChanged callback shared by every Viewer in the session.
 
-    Args:
-        node : (<nuke.nodes.Viewer>)
-            The viewer node we're going to set the callback on.
+    Registered once for the Viewer class, this replaces the per-node
+    callback strings viewerSync used to set. Knobs viewerSync doesn't care
+    about are filtered out first, then the caller's group is looked up in
+    the in-memory group tables. Viewers outside any group return there.
 
-        viewers : [<nuke.nodes.Viewer>]
-            The viewers the callback should reference.
+    Since nothing is written to the viewer's own knobChanged knob, viewers
+    that carry another tool's callback can be synced all the same.
+
+    Args:
+        N/A
 
     Returns:
         None
@@ -363,80 +581,148 @@ def _set_callback(node, viewers):
         N/A
 
     """
-    # Create a copy of list, as we're poppin' the `node` if found.
-    viewers = list(viewers)
-    # Remove our caller from the nodes to update if present.
-    if node in viewers:
-        viewers.pop(viewers.index(node))
+    knob = nuke.thisKnob().name()
+    if knob not in _DISPATCH_KNOBS or _SUPPRESSED:
+        return
 
-    # Get the list of node names to populate the arg with
-    viewer_names = [viewer.fullName() for viewer in viewers]
+    if knob == 'name':
+        _index_renamed()
+        return
 
-    node['knobChanged'].setValue(
-        'viewerSync.sync_viewers({viewers})'.format(
-            viewers=viewer_names
-        )
+    if not _INDEX_BUILT:
+        _build_viewer_index()
+
+    caller = nuke.thisNode()
+    caller_name = caller.fullName()
+    group_id = _MEMBERSHIP.get(caller_name)
+    if group_id is None:
+        return
+
+    if knob in ['showPanel', 'hidePanel']:
+        _toggle_sync_ui(caller, knob == 'showPanel')
+        return
+
+    if _PAUSED:
+        _note_paused_change(caller, knob, group_id)
+        return
+
+    if not _should_sync(caller, knob):
+        return
+
+    _propagate(
+        caller, knob, _group_targets(group_id, caller_name), group_id
     )
 
 # =============================================================================
-# PUBLIC FUNCTIONS
-# =============================================================================
 
 
-def remove_callbacks():
-    """Removes callback from all selected viewers and all viewers linked.
+def _enabled_toggles(viewer):
+    """Returns the knobs a viewer is set to sync.
+
+    Args:
+        viewer : (<nuke.nodes.Viewer>)
+            The viewer to check.
+
+    Returns:
+        (frozenset)
+            Knob names, without the `vs_` prefix. Empty if the viewer has no
+            viewerSync toggles.
+
+    Raises:
+        N/A
+
+    """
+    mask_knob = viewer.knob('vs_mask')
+    if mask_knob:
+        return _decode_mask(int(mask_knob.value()))
+    return frozenset(
+        [knob for knob in SYNC_DEFAULTS if viewer.knob('vs_' + knob) and
+         viewer['vs_' + knob].value()]
+    )
+
+# =============================================================================
 
-    Checks to make sure that the callback present is a viewerSync callback
-    before we remove the callback, this prevents us from interfering with
-    another tool.
+
+def _encode_mask(toggles):
+    """Packs sync toggles into a `vs_mask` value.
 
     Args:
+        toggles : {str: bool}
+            Whether each knob should sync, keyed by knob name.
+
+    Returns:
+        (int)
+
+    Raises:
         N/A
 
+    """
+    mask = 0
+    for i, knob in enumerate(MASK_KNOBS):
+        if toggles.get(knob):
+            mask |= 1 << i
+    return mask
+
+# =============================================================================
+
+
+def _extract_viewer_list(viewer):
+    """Returns the Viewer nodes linked to a viewer.
+
+    The viewer's group is looked up in the group tables. Viewers synced by an
+    older viewerSync carry a `sync_viewers` callback instead, and the value
+    of its `viewers` arg is extracted.
+
+    Args:
+        viewer : (<nuke.nodes.Viewer>)
+            The viewer node to find the links of.
+
     Returns:
-        None
+        [<nuke.nodes.Viewer>]
+            The other members of the viewer's group. Empty if the viewer
+            isn't synced.
 
     Raises:
         N/A
 
     """
-    viewers = nuke.selectedNodes('Viewer')
+    group_knob = viewer.knob('vs_group')
+    if group_knob and group_knob.value():
+        if not _INDEX_BUILT:
+            _build_viewer_index()
+        viewer_name = viewer.fullName()
+        return [
+            _VIEWER_INDEX[name]
+            for name in _GROUPS.get(group_knob.value(), [])
+            if name != viewer_name and name in _VIEWER_INDEX
+        ]
 
-    if not viewers:
-        viewers = nuke.allNodes('Viewer')
-    else:
-        extra_viewers = []  # Viewers that weren't in the selected group.
-        for viewer in viewers:
-            try:
-                linked_viewers = _extract_viewer_list(viewer)
-            except ValueError:
-                pass
-            else:
-                extra_viewers.extend(linked_viewers)
+    callback = viewer['knobChanged'].value()
 
-        viewers.extend(extra_viewers)
+    if not callback or 'viewerSync.sync_viewers(' not in callback:
+        return []
 
-    for viewer in viewers:
-        if 'viewerSync' in viewer['knobChanged'].value():
-            viewer['knobChanged'].setValue('')
-        _remove_knobs(viewer)
+    callback = callback.replace('viewerSync.sync_viewers(', '')[:-1]
+    linked_viewers = literal_eval(callback)
+    viewer_nodes = [
+        nuke.toNode(node) for node in linked_viewers if nuke.toNode(node)
+    ]
+
+    return viewer_nodes
 
 # =============================================================================
 
 
-def setup_sync():
-    """Sets up a viewerSync between a group of Viewer nodes.
+def _flush_deferred():
+    """Runs every deferred knob sync queued by `_defer_sync`.
 
-    This sets up callbacks between either all selected viewers, or all viewers
-    at the current node graph level (as defined by what nuke.allNodes()
-    returns). It also sets up a series of settings on the Viewer nodes
-    themselves, controlling which knobs get synced between the Viewers.
+    Syncs run here are timed too, which is how a deferred knob gets restored
+    to immediate sync once it's back under budget.
 
-    Before setting up the viewers, we check the current knobChanged value.
-    Often that value is a viewerSync callback already. If so, we deactivate
-    that viewerSync group before continuing. If the callback is foreign (not
-    a viewerSync callback), we leave it alone and remove that Viewer from the
-    viewerSync group, rather than mess up another python process.
+    viewerSync's own callbacks are suppressed for the duration: every target
+    is written to directly, and letting the targets fan the same value out
+    again would queue stale echoes that overwrite newer changes at the next
+    flush.
 
     Args:
         N/A
@@ -448,94 +734,127 @@ def setup_sync():
         N/A
 
     """
-    # Grab all of our currently selected Viewer nodes:
-    viewers = nuke.selectedNodes('Viewer')
+    global _FLUSH_TIMER, _SUPPRESSED
+
+    _FLUSH_TIMER = None
+    pending = list(_PENDING_SYNCS.items())
+    _PENDING_SYNCS.clear()
+
+    _SUPPRESSED += 1
+    try:
+        for (caller_name, knob), target_names in pending:
+            caller = nuke.toNode('root.' + caller_name)
+            if not caller:
+                continue
+            targets = [
+                nuke.toNode('root.' + name) for name in target_names
+                if nuke.toNode('root.' + name)
+            ]
+            _record_latency(knob, _timed_sync(caller, targets, knob))
+    finally:
+        _SUPPRESSED -= 1
 
-    # We'll be using the viewer_levels dictionary to link viewers
-    # across the same DAG level, and avoid linking lone viewers on sub DAGs.
-    viewer_levels = {}
+# =============================================================================
 
-    # If we find ANY viewers of the currently selected set having a
-    # knobChanged value, we'll turn off syncing on all the node's it's linked
-    # to. Safer that way.
-    remove_viewers = []
 
-    if viewers:
-        for viewer in viewers:
-            # In case Nuke returns us viewers split across different levels,
-            # we'll need to split them up by level so that we don't
-            # attempt to link those.
-            group = '.'.join(viewer.fullName().split('.')[:-1])
-            if not group:
-                group = 'root'
-            group_viewers = viewer_levels.get(group, [])
-            group_viewers.append(viewer)
-            viewer_levels[group] = group_viewers
-    else:
-        # No viewers were provided, so we'll just grab all the viewers
-        # at our current level
-        viewers = nuke.allNodes('Viewer')
-        viewer_levels['group'] = viewers
+def _group_subscribers(group_id):
+    """Returns the subscription index of a group, building it if needed.
 
-    for level in viewer_levels.keys():
-        if len(viewer_levels[level]) <= 1:
-            # Nothing to sync, delete this level.
-            del viewer_levels[level]
+    Args:
+        group_id : (str)
+            The id of the group.
 
-    bad_viewers = []  # List of viewers that have foreign callbacks
+    Returns:
+        {str: set}
+            The names of the members subscribed to each knob.
 
-    for viewers in viewer_levels.values():
-        for viewer in viewers:
-            try:
-                linked_viewers = _extract_viewer_list(viewer)
-            except ValueError:
-                bad_viewers.append(viewer)
-            else:
-                remove_viewers.extend(linked_viewers)
+    Raises:
+        N/A
 
-    for rm_viewer in list(remove_viewers):
-        for viewers in viewer_levels.values():
-            if rm_viewer in viewers:
-                remove_viewers.remove(rm_viewer)
-        if rm_viewer in bad_viewers:
-            try:
-                remove_viewers.remove(rm_viewer)
-            except ValueError:
-                # We probably already removed this viewer above.
-                pass
+    """
+    subscribers = _SUBSCRIBERS.get(group_id)
+    if subscribers is None:
+        subscribers = {}
+        for name in _GROUPS.get(group_id, ()):
+            viewer = _VIEWER_INDEX.get(name)
+            if viewer is None:
+                continue
+            for knob in _enabled_toggles(viewer):
+                subscribers.setdefault(knob, set()).add(name)
+        _SUBSCRIBERS[group_id] = subscribers
+    return subscribers
 
-    if remove_viewers:
-        for viewer in set(remove_viewers):
-            viewer['knobChanged'].setValue('')
-            _remove_knobs(viewer)
+# =============================================================================
 
-    for viewers in viewer_levels.values():
-        for viewer in bad_viewers:
-            if viewer in viewers:
-                viewers.remove(viewer)
-        for viewer in viewers:
-            _add_sync_knobs(viewer)
-            _set_callback(viewer, viewers)
+
+def _group_targets(group_id, caller_name):
+    """Returns a lookup of the group members subscribed to each knob.
+
+    Args:
+        group_id : (str)
+            The id of the caller's group.
+
+        caller_name : (str)
+            The full name of the caller, which is never its own target.
+
+    Returns:
+        (callable)
+            Given a knob name, returns the subscribed viewers, as
+            `_propagate` expects.
+
+    Raises:
+        N/A
+
+    """
+    subscribers = _group_subscribers(group_id)
+
+    def targets_for(sync_knob):
+        """Returns the group members other than caller subscribed to knob"""
+        return [
+            _VIEWER_INDEX[name] for name in subscribers.get(sync_knob, ())
+            if name != caller_name and name in _VIEWER_INDEX
+        ]
+
+    return targets_for
 
 # =============================================================================
 
 
-def sync_viewers(viewers):
-    """Syncs all the given viewers to the settings on the caller node.
+def _has_sync_knobs(viewer):
+    """Returns True if the viewer carries viewerSync toggles in any form."""
+    return bool(viewer.knob('vs_mask') or viewer.knob('vs_options'))
 
-    This is the primary callback for viewerSync. Through it, the actual sync
-    happens. Before the callback executes, we compare the calling knob to a
-    list of knobs that viewerSync is concerned about. If the caller knob isn't
-    on the white-list, or the calling knob isn't currently set to sync (via the
-    caller node's settings) we return early.
+# =============================================================================
 
-    Otherwise we sync the knob values for the knob that called us.
+
+def _index_created():
+    """onCreate callback adding a new Viewer to the viewer index."""
+    if _INDEX_BUILT:
+        viewer = nuke.thisNode()
+        _VIEWER_INDEX[viewer.fullName()] = viewer
+        _join_group(viewer)
+
+# =============================================================================
+
+
+def _index_destroyed():
+    """onDestroy callback dropping a Viewer from the index and caches."""
+    viewer = nuke.thisNode()
+    _VIEWER_INDEX.pop(viewer.fullName(), None)
+    _leave_group(viewer.fullName())
+    _invalidate_input_caches(viewer)
+
+# =============================================================================
+
+
+def _index_renamed():
+    """knobChanged callback re-keying the viewer index after a rename.
+
+    Only the 'name' knob is of interest. Since renaming a Group changes the
+    full name of every viewer inside it, all entries are checked.
 
     Args:
-        viewers : [str]
-            This list of absolute viewer names will be resolved into
-            <nuke.nodes.Viewer>s, which will be synced to the caller
-            node's knob values.
+        N/A
 
     Returns:
         None
@@ -544,45 +863,1345 @@ def sync_viewers(viewers):
         N/A
 
     """
+    if not _INDEX_BUILT or nuke.thisKnob().name() != 'name':
+        return
 
-    caller = nuke.thisNode()
-    caller_knob = nuke.thisKnob().name()
+    for name, viewer in list(_VIEWER_INDEX.items()):
+        try:
+            full_name = viewer.fullName()
+        except ValueError:
+            # The node has been deleted.
+            del _VIEWER_INDEX[name]
+            _leave_group(name)
+            continue
+        if full_name != name:
+            del _VIEWER_INDEX[name]
+            _VIEWER_INDEX[full_name] = viewer
+            group_id = _leave_group(name)
+            if group_id is not None:
+                _GROUPS.setdefault(group_id, set()).add(full_name)
+                _MEMBERSHIP[full_name] = group_id
+            _invalidate_input_caches(viewer)
+            # Drop what was cached under the old name, too.
+            _LAYER_CACHE.pop(name, None)
 
-    # We need to check what knob is calling us first- if that knob isn't a
-    # syncing knob, we'll return.
-    if caller_knob not in ['inputChange', 'knobChanged']:
-        if caller_knob not in SYNC_DEFAULTS.keys() + VIEWER_SYNC_KNOBS:
-            return
+# =============================================================================
 
-        if caller_knob not in VIEWER_SYNC_KNOBS:
-            if not caller['vs_{knob}'.format(knob=caller_knob)].value():
-                # Sync setting is false for this knob
-                return
 
-    # Grab our viewer nodes and remove any that have been deleted.
-    viewer_nodes = [
-        nuke.toNode(viewer) for viewer in viewers if nuke.toNode(viewer)
-    ]
+def _index_reset():
+    """onScriptClose callback emptying the viewer index and all caches.
 
-    if caller_knob in VIEWER_SYNC_KNOBS:
-        # Sync setting and continue
-        _sync_knob(caller, viewer_nodes, caller_knob)
-        if caller[caller_knob].value():
-            caller_knob = caller_knob.replace('vs_', '')
+    Everything viewerSync keeps per viewer is keyed by node name, and names
+    repeat from one script to the next, so nothing may outlive its script.
 
-    if caller_knob in ['inputChange', 'inputs']:
-        if caller['vs_inputs'].value():
-            for viewer in viewer_nodes:
-                for i in xrange(caller.inputs()):
-                    viewer.setInput(i, caller.input(i))
-        return
-    elif caller_knob == 'knobChanged':
-        knob_list = [
-            knob for knob in SYNC_DEFAULTS.keys() if SYNC_DEFAULTS[knob]
-        ]
-    else:
-        knob_list = [caller_knob]
+    Args:
+        N/A
 
-    # Update remaining viewers to point at our current node.
-    for knob in knob_list:
-        _sync_knob(caller, viewer_nodes, knob)
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    global _INDEX_BUILT
+
+    _VIEWER_INDEX.clear()
+    _GROUPS.clear()
+    _MEMBERSHIP.clear()
+    _SUBSCRIBERS.clear()
+    _LAYER_CACHE.clear()
+    _PENDING_SYNCS.clear()
+    _PAUSED_CHANGES.clear()
+    _INDEX_BUILT = False
+
+# =============================================================================
+
+
+def _indexed_viewers(level=None, selected=False):
+    """Returns viewers from the viewer index, building it if needed.
+
+    Args:
+        level=None : (str)
+            Only return viewers at this Group level, as returned by
+            `_viewer_level`. All levels are returned if None.
+
+        selected=False : (bool)
+            Only return selected viewers.
+
+    Returns:
+        [<nuke.nodes.Viewer>]
+
+    Raises:
+        N/A
+
+    """
+    if not _INDEX_BUILT:
+        _build_viewer_index()
+
+    viewers = []
+    for name in sorted(_VIEWER_INDEX):
+        viewer = _VIEWER_INDEX[name]
+        if level is not None and _viewer_level(viewer) != level:
+            continue
+        if selected and not viewer.isSelected():
+            continue
+        viewers.append(viewer)
+    return viewers
+
+# =============================================================================
+
+
+def _install_dispatcher():
+    """Registers the Viewer knobChanged dispatcher, once per GUI session."""
+    global _DISPATCHER_ADDED
+
+    if not _DISPATCHER_ADDED and not _HEADLESS:
+        nuke.addKnobChanged(_dispatch_knob_changed, nodeClass='Viewer')
+        _DISPATCHER_ADDED = True
+
+# =============================================================================
+
+
+def _invalidate_input_caches(viewer):
+    """Drops everything cached about what a viewer is looking at.
+
+    Args:
+        viewer : (<nuke.nodes.Viewer>)
+            The viewer whose inputs changed.
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    _LAYER_CACHE.pop(viewer.fullName(), None)
+
+# =============================================================================
+
+
+def _join_group(viewer):
+    """Adds a viewer to the group tables, if its `vs_group` knob names one.
+
+    Args:
+        viewer : (<nuke.nodes.Viewer>)
+            The viewer to add.
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    group_knob = viewer.knob('vs_group')
+    if not group_knob or not group_knob.value():
+        return
+    group_id = group_knob.value()
+    viewer_name = viewer.fullName()
+    _leave_group(viewer_name)
+    _GROUPS.setdefault(group_id, set()).add(viewer_name)
+    _MEMBERSHIP[viewer_name] = group_id
+    _SUBSCRIBERS.pop(group_id, None)
+
+# =============================================================================
+
+
+def _leave_group(viewer_name):
+    """Removes a viewer from the group tables.
+
+    Args:
+        viewer_name : (str)
+            The full name the viewer is recorded under.
+
+    Returns:
+        (str|None)
+            The id of the group the viewer was in, if any.
+
+    Raises:
+        N/A
+
+    """
+    group_id = _MEMBERSHIP.pop(viewer_name, None)
+    if group_id is not None:
+        _SUBSCRIBERS.pop(group_id, None)
+        members = _GROUPS.get(group_id)
+        if members is not None:
+            members.discard(viewer_name)
+            if not members:
+                del _GROUPS[group_id]
+    return group_id
+
+# =============================================================================
+
+
+def _listed_targets(viewers):
+    """Returns a lookup of the listed viewers subscribed to each knob.
+
+    Used for viewers still synced by an old `sync_viewers` callback string,
+    which aren't part of the group tables.
+
+    Args:
+        viewers : [str]
+            Absolute names of the linked viewers.
+
+    Returns:
+        (callable)
+            Given a knob name, returns the viewers whose own toggle for it is
+            on, as `_propagate` expects.
+
+    Raises:
+        N/A
+
+    """
+    # Grab our viewer nodes and remove any that have been deleted.
+    viewer_nodes = [
+        nuke.toNode(viewer) for viewer in viewers if nuke.toNode(viewer)
+    ]
+
+    def targets_for(sync_knob):
+        """Returns the viewers whose own toggle for knob is on"""
+        return [
+            viewer for viewer in viewer_nodes
+            if _has_sync_knobs(viewer) and _sync_enabled(viewer, sync_knob)
+        ]
+
+    return targets_for
+
+# =============================================================================
+
+
+def _map_roi(roi, scale_x, scale_y):
+    """Scales an ROI value, preserving the form the knob returned it in.
+
+    Args:
+        roi : ({str: float}|[float])
+            An ROI as returned by the roi knob, either a dictionary with
+            'x', 'y', 'r' and 't' keys or an (x, y, r, t) sequence.
+
+        scale_x : (float)
+            Horizontal scale factor.
+
+        scale_y : (float)
+            Vertical scale factor.
+
+    Returns:
+        ({str: float}|[float])
+
+    Raises:
+        N/A
+
+    """
+    if isinstance(roi, dict):
+        mapped = dict(roi)
+        for key, scale in [('x', scale_x), ('y', scale_y), ('r', scale_x),
+                           ('t', scale_y)]:
+            if key in mapped:
+                mapped[key] = mapped[key] * scale
+        return mapped
+
+    scales = [scale_x, scale_y, scale_x, scale_y]
+    return [value * scales[i % 4] for i, value in enumerate(roi)]
+
+# =============================================================================
+
+
+def _note_paused_change(caller, caller_knob, group):
+    """Records a knob change made while sync is paused.
+
+    Only the last change to each knob of each group is kept, so resuming
+    pushes every changed knob exactly once. Toggle changes still update the
+    caller's own toggle bookkeeping straight away, as that never touches
+    another viewer.
+
+    Args:
+        caller : (<nuke.nodes.Viewer>)
+            The viewer whose knob changed.
+
+        caller_knob : (str)
+            The name of the knob that changed.
+
+        group : (str|(str))
+            The caller's group id, or the names of its linked viewers.
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    if caller_knob in _TOGGLE_KNOBS:
+        toggle = caller_knob.replace('vs_', '')
+        enabled = bool(caller[caller_knob].value())
+        _set_toggle(caller, toggle, enabled)
+        _update_subscription(caller, toggle, enabled)
+        if not enabled:
+            return
+        caller_knob = toggle
+    elif caller_knob == 'inputChange':
+        _invalidate_input_caches(caller)
+        caller_knob = 'inputs'
+    elif caller_knob not in _SYNCED_KNOBS:
+        return
+
+    _PAUSED_CHANGES[(group, caller_knob)] = caller.fullName()
+
+# =============================================================================
+
+
+def _propagate(caller, caller_knob, targets_for, group_id=None):
+    """Syncs the caller's changed knob to the subscribed linked viewers.
+
+    This is the shared body of `sync_viewers` and the knobChanged
+    dispatcher, run once `_should_sync` has decided the change matters.
+
+    Each viewer's toggles decide both what it sends and what it receives, so
+    toggling a knob only changes the caller's own subscription.
+
+    Args:
+        caller : (<nuke.nodes.Viewer>)
+            The viewer whose knob changed.
+
+        caller_knob : (str)
+            The name of the knob that changed.
+
+        targets_for : (callable)
+            Given a knob name, returns the linked viewers subscribed to that
+            knob, excluding the caller.
+
+        group_id=None : (str)
+            The id of the caller's group. If that group is bridged to other
+            sessions, the change is published to them too. Viewers still on
+            an old callback string have no group id, and are never bridged.
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    if caller_knob in _TOGGLE_KNOBS:
+        toggle = caller_knob.replace('vs_', '')
+        enabled = bool(caller[caller_knob].value())
+        _set_toggle(caller, toggle, enabled)
+        _update_subscription(caller, toggle, enabled)
+        if not enabled:
+            return
+        # Push our current value to the viewers we just joined.
+        caller_knob = toggle
+
+    if caller_knob in ['inputChange', 'inputs']:
+        _invalidate_input_caches(caller)
+        if _sync_enabled(caller, 'inputs'):
+            _watched_sync(caller, targets_for('inputs'), 'inputs')
+        return
+    elif caller_knob == 'knobChanged':
+        knob_list = sorted(_enabled_toggles(caller))
+    else:
+        knob_list = [caller_knob]
+
+    # Update remaining viewers to point at our current node.
+    for knob in knob_list:
+        _watched_sync(caller, targets_for(knob), knob)
+
+    # Changes that came in over the bridge have already reached every
+    # session, don't echo them back.
+    bridge = _BRIDGES.get(group_id)
+    if bridge is not None and not bridge.applying:
+        for knob in knob_list:
+            try:
+                bridge.publish(knob, caller[knob].value())
+            except NameError:
+                continue
+
+# =============================================================================
+
+
+def _record_latency(knob, elapsed):
+    """Updates the latency watchdog with the duration of a knob sync.
+
+    Switches the knob to deferred propagation, or back to immediate, when it
+    has been over or under LATENCY_BUDGET for LATENCY_STRIKES syncs in a
+    row. Either switch is reported.
+
+    Args:
+        knob : (str)
+            The knob that was synced.
+
+        elapsed : (float)
+            How many seconds the sync took.
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    if elapsed > LATENCY_BUDGET:
+        _UNDER_BUDGET[knob] = 0
+        _OVER_BUDGET[knob] = _OVER_BUDGET.get(knob, 0) + 1
+        if (knob not in _DEFERRED_KNOBS and
+                _OVER_BUDGET[knob] >= LATENCY_STRIKES):
+            _DEFERRED_KNOBS.add(knob)
+            print(
+                'viewerSync: syncing "{knob}" took {ms:.0f}ms, over the '
+                '{budget:.0f}ms budget. Deferring its sync.'.format(
+                    knob=knob, ms=elapsed * 1000,
+                    budget=LATENCY_BUDGET * 1000
+                )
+            )
+    else:
+        _OVER_BUDGET[knob] = 0
+        if knob in _DEFERRED_KNOBS:
+            _UNDER_BUDGET[knob] = _UNDER_BUDGET.get(knob, 0) + 1
+            if _UNDER_BUDGET[knob] >= LATENCY_STRIKES:
+                _DEFERRED_KNOBS.discard(knob)
+                _UNDER_BUDGET[knob] = 0
+                print(
+                    'viewerSync: syncing "{knob}" is back under budget. '
+                    'Restoring immediate sync.'.format(knob=knob)
+                )
+
+# =============================================================================
+
+
+def _remove_knobs(viewer):
+    """Removes all viewerSync knobs from a viewer.
+
+    Since this function only deletes the knobs viewerSync adds, and checks
+    for each one first, it should not raise any exceptions due to missing
+    knobs. One should be able to run this on a Viewer- or any node for that
+    matter- with no viewerSync knobs on it whatsoever and not raise any
+    errors.
+
+    Args:
+        viewer : (<nuke.nodes.Viewer>)
+            The viewer node with the viewerSync knobs on it.
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    _remove_sync_ui(viewer)
+    for name in ['vs_mask', 'vs_group']:
+        knob = viewer.knob(name)
+        if knob:
+            viewer.removeKnob(knob)
+
+# =============================================================================
+
+
+def _remove_sync_ui(viewer):
+    """Removes the Viewer Sync tab and its checkboxes from a viewer.
+
+    Only the knobs viewerSync knows it adds are looked up, rather than
+    walking every knob on the viewer.
+
+    Args:
+        viewer : (<nuke.nodes.Viewer>)
+            The viewer node to remove the tab from.
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    for name in VIEWER_SYNC_KNOBS + SYNC_UI_KNOBS:
+        knob = viewer.knob(name)
+        if knob:
+            viewer.removeKnob(knob)
+    # The tab knob goes last.
+    tab = viewer.knob('vs_options')
+    if tab:
+        viewer.removeKnob(tab)
+
+# =============================================================================
+
+
+def _roi_transform(source_format, target_format):
+    """Returns the scale factors that map an ROI between two formats.
+
+    Args:
+        source_format : ((int, int, int))
+            The (width, height, proxy scale) the ROI is defined in.
+
+        target_format : ((int, int, int))
+            The (width, height, proxy scale) to map the ROI into.
+
+    Returns:
+        (float, float)
+            The horizontal and vertical scale factors.
+
+    Raises:
+        N/A
+
+    """
+    key = (source_format, target_format)
+    transform = _ROI_TRANSFORMS.get(key)
+    if transform is None:
+        if len(_ROI_TRANSFORMS) >= ROI_CACHE_LIMIT:
+            _ROI_TRANSFORMS.clear()
+        source_width, source_height, source_scale = source_format
+        target_width, target_height, target_scale = target_format
+        transform = (
+            (float(target_width) / target_scale) /
+            (float(source_width) / source_scale),
+            (float(target_height) / target_scale) /
+            (float(source_height) / source_scale),
+        )
+        _ROI_TRANSFORMS[key] = transform
+    return transform
+
+# =============================================================================
+
+
+def _set_toggle(viewer, knob, value):
+    """Turns syncing of a knob on or off for a viewer.
+
+    Writes to `vs_mask` when the viewer uses bitmask storage, and to the
+    matching checkbox whenever it exists.
+
+    Args:
+        viewer : (<nuke.nodes.Viewer>)
+            The viewer whose toggle to set.
+
+        knob : (str)
+            The synced knob the toggle is for, without the `vs_` prefix.
+
+        value : (bool)
+            Whether the knob should sync.
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    mask_knob = viewer.knob('vs_mask')
+    if mask_knob:
+        mask = int(mask_knob.value())
+        bit = 1 << MASK_KNOBS.index(knob)
+        new_mask = mask | bit if value else mask & ~bit
+        if new_mask != mask:
+            mask_knob.setValue(new_mask)
+
+    toggle_knob = viewer.knob('vs_' + knob)
+    if toggle_knob and bool(toggle_knob.value()) != bool(value):
+        toggle_knob.setValue(value)
+
+# =============================================================================
+
+
+def _sync_channels(source, targets):
+    """Syncs the viewed channels to targets whose input has that layer.
+
+    Targets viewing a node without the source's layer are left alone, rather
+    than being pointed at a layer they can't show. A cached layer list that
+    lacks the layer is read again before a target is skipped, as an
+    upstream node may have added it since.
+
+    Args:
+        source : (<nuke.nodes.Viewer>)
+            The viewer to sync the channels from.
+
+        targets : [<nuke.nodes.Viewer>]
+            The viewers to sync the channels to.
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    channels = source['channels'].value()
+    # A single channel like 'rgba.red' needs its layer.
+    layer = channels.split('.')[0]
+
+    for target in targets:
+        layers = _available_layers(target)
+        if layers is not None and layer not in layers:
+            layers = _available_layers(target, refresh=True)
+            if layer not in layers:
+                continue
+        try:
+            target['channels'].setValue(channels)
+        except NameError:
+            # Knob doesn't exist on target.
+            continue
+
+# =============================================================================
+
+
+def _sync_enabled(viewer, knob):
+    """Returns True if a viewer is set to sync the given knob.
+
+    Args:
+        viewer : (<nuke.nodes.Viewer>)
+            The viewer to check.
+
+        knob : (str)
+            The synced knob, without the `vs_` prefix.
+
+    Returns:
+        (bool)
+
+    Raises:
+        NameError
+            If the viewer has no viewerSync toggles.
+
+    """
+    mask_knob = viewer.knob('vs_mask')
+    if mask_knob:
+        return knob in _decode_mask(int(mask_knob.value()))
+    return bool(viewer['vs_' + knob].value())
+
+# =============================================================================
+
+
+def _sync_inputs(source, targets):
+    """Connects every target to the same input nodes as the source.
+
+    Args:
+        source : (<nuke.Node>)
+            The node whose inputs should be copied.
+
+        targets : [<nuke.Node>]
+            The nodes to connect.
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    for target in targets:
+        for i in range(source.inputs()):
+            target.setInput(i, source.input(i))
+        _invalidate_input_caches(target)
+
+# =============================================================================
+
+
+def _sync_knob(source, targets, knob):
+    """Syncs a knob setting from the source to the target.
+
+    Args:
+        source : (<nuke.Node>)
+            Any node that has a knob with a value we want to sync from.
+
+        targets : [<nuke.Node>]
+            A list of nodes that should have the same knob as source, that we
+            want to have the same value as source. The call to these nodes
+            and knobs is protected by a try/except, so even if the knob is
+            missing it should resolve without error.
+
+        knob : (str)
+            The knob name to match between the source and the targets.
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    for target in targets:
+        try:
+            target[knob].setValue(source[knob].value())
+        except NameError:
+            # Knob doesn't exist on target.
+            continue
+
+# =============================================================================
+
+
+def _sync_roi(source, targets):
+    """Syncs the ROI, mapped into the format each target is viewing.
+
+    Targets viewing the same format at the same proxy scale as the source, or
+    viewing nothing at all, get the ROI unchanged.
+
+    Args:
+        source : (<nuke.nodes.Viewer>)
+            The viewer to sync the ROI from.
+
+        targets : [<nuke.nodes.Viewer>]
+            The viewers to sync the ROI to.
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    roi = source['roi'].value()
+    source_format = _viewer_format(source)
+
+    for target in targets:
+        target_format = _viewer_format(target)
+        if (source_format is None or target_format is None or
+                source_format == target_format):
+            target_roi = roi
+        else:
+            target_roi = _map_roi(
+                roi, *_roi_transform(source_format, target_format)
+            )
+        try:
+            target['roi'].setValue(target_roi)
+        except NameError:
+            # Knob doesn't exist on target.
+            continue
+
+# =============================================================================
+
+
+def _set_group(viewer, group_id):
+    """Makes a viewer a member of a viewerSync group.
+
+    The group id is stored on the viewer's hidden `vs_group` knob, so that
+    groups survive saving and reopening the script, and recorded in the
+    group tables the dispatcher reads. Any viewerSync callback string left
+    on the viewer by an older version is cleared, as it would sync the
+    viewer a second time.
+
+    Args:
+        viewer : (<nuke.nodes.Viewer>)
+            The viewer to add to the group.
+
+        group_id : (str)
+            The id of the group.
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    if 'viewerSync.sync_viewers(' in viewer['knobChanged'].value():
+        viewer['knobChanged'].setValue('')
+
+    group_knob = viewer.knob('vs_group')
+    if not group_knob:
+        group_knob = nuke.String_Knob('vs_group', 'viewerSync group')
+        group_knob.setFlag(nuke.INVISIBLE)
+        viewer.addKnob(group_knob)
+    group_knob.setValue(group_id)
+
+    if not _INDEX_BUILT:
+        _build_viewer_index()
+    _join_group(viewer)
+
+# =============================================================================
+
+
+def _should_sync(caller, caller_knob):
+    """Returns True if a knob change on caller should be synced.
+
+    Args:
+        caller : (<nuke.nodes.Viewer>)
+            The viewer whose knob changed.
+
+        caller_knob : (str)
+            The name of the knob that changed.
+
+    Returns:
+        (bool)
+            False if the knob isn't a syncing knob, or the caller isn't
+            currently set to sync it.
+
+    Raises:
+        N/A
+
+    """
+    if caller_knob in ['inputChange', 'knobChanged']:
+        return True
+    elif caller_knob in _TOGGLE_KNOBS:
+        return True
+    elif caller_knob in _SYNCED_KNOBS:
+        return _sync_enabled(caller, caller_knob)
+    return False
+
+# =============================================================================
+
+
+def _timed_sync(source, targets, knob):
+    """Syncs a knob, or the inputs, from source to targets and times it.
+
+    Args:
+        source : (<nuke.Node>)
+            The node to sync from.
+
+        targets : [<nuke.Node>]
+            The nodes to sync to.
+
+        knob : (str)
+            The knob to sync. 'inputs' syncs the input connections.
+
+    Returns:
+        (float)
+            How many seconds the sync took.
+
+    Raises:
+        N/A
+
+    """
+    start = time.time()
+    if knob == 'inputs':
+        _sync_inputs(source, targets)
+    elif knob == 'channels':
+        _sync_channels(source, targets)
+    elif knob == 'roi':
+        _sync_roi(source, targets)
+    else:
+        _sync_knob(source, targets, knob)
+    return time.time() - start
+
+# =============================================================================
+
+
+def _viewer_format(viewer):
+    """Returns the format a viewer displays, including its proxy scale.
+
+    The viewed node's format and the viewer's proxy scale are read every
+    time, as an upstream Read or Reformat can change the format without
+    the viewer's inputs changing. Only the ROI mapping between two formats
+    is cached, see `_ROI_TRANSFORMS`.
+
+    The viewer's downrez only scales the image while proxy mode is on, so
+    the proxy scale is 1 whenever it's off, whatever downrez is set to.
+
+    Args:
+        viewer : (<nuke.nodes.Viewer>)
+            The viewer to check.
+
+    Returns:
+        ((int, int, int)|None)
+            The (width, height, proxy scale), or None if the viewer views
+            nothing.
+
+    Raises:
+        N/A
+
+    """
+    node = _viewed_node(viewer)
+    if node is None:
+        return None
+
+    node_format = node.format()
+    size = (node_format.width(), node_format.height())
+
+    scale = 1
+    if nuke.root()['proxy'].value():
+        try:
+            scale = max(int(viewer['downrez'].value()), 1)
+        except (NameError, TypeError, ValueError):
+            pass
+
+    return size + (scale,)
+
+# =============================================================================
+
+
+def _viewer_level(node):
+    """Returns the name of the Group level a node sits at.
+
+    Args:
+        node : (<nuke.Node>)
+            The node to check. Passing a Group (or the Root) returns the
+            level of the node graph inside it.
+
+    Returns:
+        (str)
+            The full name of the parent Group, or 'root' for top level nodes.
+
+    Raises:
+        N/A
+
+    """
+    if node.Class() in ['Group', 'Root']:
+        return node.fullName()
+    level = '.'.join(node.fullName().split('.')[:-1])
+    return level if level else 'root'
+
+# =============================================================================
+
+
+def _toggle_sync_ui(viewer, show):
+    """Builds or tears down the Viewer Sync tab of a bitmask viewer.
+
+    Called as the viewer's properties panel opens and closes, so that the
+    checkboxes only exist while someone can see them.
+
+    Args:
+        viewer : (<nuke.nodes.Viewer>)
+            The viewer whose panel is opening or closing.
+
+        show : (bool)
+            True if the panel is opening.
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    mask_knob = viewer.knob('vs_mask')
+    if not mask_knob:
+        return
+
+    if show:
+        if not viewer.knob('vs_options'):
+            toggles = _decode_mask(int(mask_knob.value()))
+            _add_sync_ui(
+                viewer, dict([(knob, knob in toggles) for knob in MASK_KNOBS])
+            )
+    else:
+        _remove_sync_ui(viewer)
+
+# =============================================================================
+
+
+def _unlink_viewer(viewer):
+    """Takes a viewer out of viewerSync entirely.
+
+    Args:
+        viewer : (<nuke.nodes.Viewer>)
+            The viewer to unlink.
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    if 'viewerSync.sync_viewers(' in viewer['knobChanged'].value():
+        viewer['knobChanged'].setValue('')
+    _remove_knobs(viewer)
+    _leave_group(viewer.fullName())
+    _invalidate_input_caches(viewer)
+
+# =============================================================================
+
+
+def _update_subscription(viewer, knob, enabled):
+    """Records a viewer's toggle change in its group's subscription index.
+
+    Args:
+        viewer : (<nuke.nodes.Viewer>)
+            The viewer whose toggle changed.
+
+        knob : (str)
+            The knob the toggle is for, without the `vs_` prefix.
+
+        enabled : (bool)
+            The new value of the toggle.
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    group_id = _MEMBERSHIP.get(viewer.fullName())
+    subscribers = _SUBSCRIBERS.get(group_id)
+    if subscribers is None:
+        # Not indexed yet, it'll be built from the toggles when needed.
+        return
+    if enabled:
+        subscribers.setdefault(knob, set()).add(viewer.fullName())
+    else:
+        subscribers.get(knob, set()).discard(viewer.fullName())
+
+# =============================================================================
+
+
+def _viewed_node(viewer):
+    """Returns the node a viewer is currently viewing.
+
+    Args:
+        viewer : (<nuke.nodes.Viewer>)
+            The viewer to check.
+
+    Returns:
+        (<nuke.Node>|None)
+            The node connected to the viewer's active input, if any.
+
+    Raises:
+        N/A
+
+    """
+    try:
+        input_number = int(viewer['input_number'].getValue())
+    except (NameError, TypeError, ValueError):
+        input_number = 0
+    return viewer.input(input_number)
+
+# =============================================================================
+
+
+def _watched_sync(source, targets, knob):
+    """Syncs a knob immediately or deferred, as the latency watchdog decides.
+
+    Args:
+        source : (<nuke.Node>)
+            The node to sync from.
+
+        targets : [<nuke.Node>]
+            The nodes to sync to.
+
+        knob : (str)
+            The knob to sync. 'inputs' syncs the input connections.
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    if knob in _DEFERRED_KNOBS:
+        _defer_sync(source, targets, knob)
+    else:
+        _record_latency(knob, _timed_sync(source, targets, knob))
+
+# =============================================================================
+# PUBLIC FUNCTIONS
+# =============================================================================
+
+
+def deferred_knobs():
+    """Returns the knobs the latency watchdog has switched to deferred sync.
+
+    Args:
+        N/A
+
+    Returns:
+        [str]
+            Knob names, sorted.
+
+    Raises:
+        N/A
+
+    """
+    return sorted(_DEFERRED_KNOBS)
+
+# =============================================================================
+
+
+def pause_sync():
+    """Pauses viewerSync until a matching `resume_sync()`.
+
+    While paused, no knob change is synced. Only which knobs changed is
+    recorded, and `resume_sync()` then pushes each of them once. Use this
+    around script loads, template operations or any batch of edits to
+    viewers. Calls nest, sync resumes when every pause has been resumed.
+
+    Args:
+        N/A
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    global _PAUSED
+
+    _PAUSED += 1
+
+# =============================================================================
+
+
+def remove_callbacks():
+    """Removes sync from all selected viewers and all viewers linked.
+
+    Only viewerSync callbacks left by older versions are cleared from the
+    knobChanged knob, this prevents us from interfering with another tool.
+
+    Args:
+        N/A
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    level = _viewer_level(nuke.thisGroup())
+    viewers = _indexed_viewers(level, selected=True)
+
+    if not viewers:
+        viewers = _indexed_viewers(level)
+    else:
+        extra_viewers = []  # Viewers that weren't in the selected group.
+        for viewer in viewers:
+            extra_viewers.extend(_extract_viewer_list(viewer))
+
+        viewers.extend(extra_viewers)
+
+    for viewer in viewers:
+        _unlink_viewer(viewer)
+
+# =============================================================================
+
+
+def resume_sync():
+    """Resumes viewerSync after `pause_sync()`, reconciling once.
+
+    When the last pause is resumed, every knob that changed while paused is
+    synced from the viewer that changed it last, to the viewers subscribed
+    to it. Knobs that didn't change aren't touched.
+
+    Args:
+        N/A
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    global _PAUSED, _SUPPRESSED
+
+    if not _PAUSED:
+        return
+    _PAUSED -= 1
+    if _PAUSED:
+        return
+
+    changes = list(_PAUSED_CHANGES.items())
+    _PAUSED_CHANGES.clear()
+
+    # Every subscriber is written to directly, their own callbacks needn't
+    # fan the same values out again.
+    _SUPPRESSED += 1
+    try:
+        for (group, knob), caller_name in changes:
+            caller = nuke.toNode('root.' + caller_name)
+            if not caller or not _should_sync(caller, knob):
+                continue
+            if isinstance(group, tuple):
+                targets_for = _listed_targets(group)
+                group_id = None
+            else:
+                if _MEMBERSHIP.get(caller_name) != group:
+                    # The caller left the group while we were paused.
+                    continue
+                targets_for = _group_targets(group, caller_name)
+                group_id = group
+            _propagate(caller, knob, targets_for, group_id)
+    finally:
+        _SUPPRESSED -= 1
+
+# =============================================================================
+
+
+def setup_sync(viewers=None, cross_level=False):
+    """Sets up a viewerSync between a group of Viewer nodes.
+
+    This links either all selected viewers, or all viewers at the current
+    node graph level, into a viewerSync group. It also sets up a series of
+    settings on the Viewer nodes themselves, controlling which knobs get
+    synced between the Viewers. Viewers are found through the viewer index,
+    so the cost of finding them doesn't grow with the size of the script.
+
+    Viewers at different Group levels are normally kept in separate sync
+    groups. With `cross_level`, they're all linked into one.
+
+    Before setting up the viewers, we check if any of them is already part of
+    a viewerSync group. If so, every viewer of that old group that isn't
+    being synced now is taken out of viewerSync. Syncing no longer touches
+    the viewer's knobChanged knob, so viewers carrying another tool's
+    callback are synced like any other.
+
+    Each new group starts aligned: the knobs the first of its viewers is set
+    to sync are pushed to the rest of the group once, as an older viewerSync
+    did when it wrote the knobChanged callbacks.
+
+    Args:
+        viewers=None : ([<nuke.nodes.Viewer>])
+            The viewers to sync. Defaults to the selected viewers, or all
+            viewers if none are selected. Unless `cross_level` is set, only
+            viewers at the current level are considered.
+
+        cross_level=False : (bool)
+            If True, link viewers into one group regardless of the Group
+            level they sit at.
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    global _SUPPRESSED
+
+    level = None if cross_level else _viewer_level(nuke.thisGroup())
+
+    if viewers is None:
+        # Grab all of our currently selected Viewer nodes, or failing that,
+        # all of them.
+        viewers = _indexed_viewers(level, selected=True)
+        if not viewers:
+            viewers = _indexed_viewers(level)
+
+    # We'll be using the viewer_levels dictionary to link viewers
+    # across the same DAG level, and avoid linking lone viewers on sub DAGs.
+    viewer_levels = {}
+
+    # If we find ANY viewers of the currently selected set already linked,
+    # we'll turn off syncing on all the nodes it's linked to. Safer that way.
+    remove_viewers = []
+
+    if cross_level:
+        viewer_levels['all'] = list(viewers)
+    else:
+        for viewer in viewers:
+            # In case we were given viewers split across different levels,
+            # we'll need to split them up by level so that we don't
+            # attempt to link those.
+            group = _viewer_level(viewer)
+            group_viewers = viewer_levels.get(group, [])
+            group_viewers.append(viewer)
+            viewer_levels[group] = group_viewers
+
+    for level in list(viewer_levels.keys()):
+        if len(viewer_levels[level]) <= 1:
+            # Nothing to sync, delete this level.
+            del viewer_levels[level]
+
+    syncing = set()
+    for viewers in viewer_levels.values():
+        for viewer in viewers:
+            syncing.add(viewer.fullName())
+            remove_viewers.extend(_extract_viewer_list(viewer))
+
+    removed = set()
+    for viewer in remove_viewers:
+        name = viewer.fullName()
+        if name not in syncing and name not in removed:
+            removed.add(name)
+            _unlink_viewer(viewer)
+
+    for viewers in viewer_levels.values():
+        group_id = uuid.uuid4().hex
+        for viewer in viewers:
+            _add_sync_knobs(viewer)
+            _set_group(viewer, group_id)
+
+        if _HEADLESS:
+            continue
+        # Every member is written to directly, their own callbacks needn't
+        # fan the same values out again.
+        source = viewers[0]
+        _SUPPRESSED += 1
+        try:
+            _propagate(
+                source, 'knobChanged',
+                _group_targets(group_id, source.fullName()), group_id
+            )
+        finally:
+            _SUPPRESSED -= 1
+
+    _install_dispatcher()
+
+# =============================================================================
+
+
+@contextmanager
+def sync_paused():
+    """Context manager pausing viewerSync for the duration of the block.
+
+    Example:
+        with viewerSync.sync_paused():
+            for viewer in viewers:
+                viewer['gain'].setValue(1)
+
+    Args:
+        N/A
+
+    Yields:
+        None
+
+    Raises:
+        N/A
+
+    """
+    pause_sync()
+    try:
+        yield
+    finally:
+        resume_sync()
+
+# =============================================================================
+
+
+def sync_viewers(viewers):
+    """Syncs all the given viewers to the settings on the caller node.
+
+    This was the per-node callback set by earlier versions of viewerSync,
+    and is kept so that scripts saved with those callbacks still sync. New
+    groups are handled by the class-wide knobChanged dispatcher instead.
+
+    Before the callback executes, we compare the calling knob to a list of
+    knobs that viewerSync is concerned about. If the caller knob isn't on
+    the white-list, or the calling knob isn't currently set to sync (via the
+    caller node's settings) we return early.
+
+    Otherwise we sync the knob values for the knob that called us.
+
+    Args:
+        viewers : [str]
+            This list of absolute viewer names will be resolved into
+            <nuke.nodes.Viewer>s, which will be synced to the caller
+            node's knob values.
+
+    Returns:
+        None
+
+    Raises:
+        N/A
+
+    """
+    if _HEADLESS or _SUPPRESSED:
+        return
+
+    caller = nuke.thisNode()
+    caller_knob = nuke.thisKnob().name()
+
+    if caller_knob in ['showPanel', 'hidePanel']:
+        _toggle_sync_ui(caller, caller_knob == 'showPanel')
+        return
+
+    if _PAUSED:
+        _note_paused_change(caller, caller_knob, tuple(viewers))
+        return
+
+    # We need to check what knob is calling us first- if that knob isn't a
+    # syncing knob, or isn't set to sync, we'll return.
+    if not _should_sync(caller, caller_knob):
+        return
+
+    _propagate(caller, caller_knob, _listed_targets(viewers))